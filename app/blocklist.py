@@ -0,0 +1,170 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import timezone
+
+
+class BloomFilter:
+    """
+    Fixed size Bloom filter. Answers "definitely not added" or "probably added".
+    """
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = max(capacity, 1)
+        self.size = max(int(-self.capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hash_count = max(int(round(self.size / self.capacity * math.log(2))), 1)
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, item):
+        """
+        Add item to filter
+        :param item: string
+        :return: None
+        """
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationCache:
+    """
+    In-memory set of revoked jwt ids with their expiration time, fronted by a Bloom filter.
+    Revocations made by other processes are picked up by an incremental reload of
+    the revoked_tokens table every refresh_interval seconds.
+    """
+
+    def __init__(self, capacity=100000, error_rate=0.001, refresh_interval=5.0, purge_interval=3600.0):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.refresh_interval = refresh_interval
+        self.purge_interval = purge_interval
+        self.max_token_lifetime = None
+        self._lock = threading.Lock()
+        self._revoked = {}
+        self._bloom = BloomFilter(capacity, error_rate)
+        self._last_id = 0
+        self._next_refresh = 0.0
+        self._next_purge = 0.0
+        self._seeded = False
+
+    def configure(self, refresh_interval=None, max_token_lifetime=None):
+        """
+        Apply settings of the application
+        :param refresh_interval: seconds between reloads of revocations made by other processes
+        :param max_token_lifetime: longest lifetime of issued tokens in seconds, None - tokens never expire
+        :return: None
+        """
+        if refresh_interval is not None:
+            self.refresh_interval = refresh_interval
+        self.max_token_lifetime = max_token_lifetime
+
+    def seed(self):
+        """
+        Load all revoked tokens which are not expired yet, dropping expired rows from the database
+        :return: None
+        """
+        from app.models import RevokedTokenModel
+
+        with self._lock:
+            self._revoked = {}
+            self._last_id = 0
+            self._purge_database(RevokedTokenModel)
+            self._load(RevokedTokenModel)
+            self._rebuild_bloom()
+            self._seeded = True
+
+    def add(self, jti, expires=None):
+        """
+        Remember revoked token
+        :param jti: jwt id
+        :param expires: token expiration timestamp, None - calculated from max token lifetime
+        :return: None
+        """
+        with self._lock:
+            self._remember(jti, expires or self._expires_from(time.time()))
+
+    def is_revoked(self, jti):
+        """
+        Check if token is revoked
+        :param jti: jwt id
+        :return: True or False
+        """
+        if not self._seeded:
+            self.seed()
+        elif time.monotonic() >= self._next_refresh:
+            self.refresh()
+
+        if jti not in self._bloom:
+            return False
+        expires = self._revoked.get(jti)
+        if expires is None:
+            return False
+        if expires <= time.time():
+            # expired tokens are rejected by their own "exp" claim
+            self._revoked.pop(jti, None)
+            return False
+        return True
+
+    def refresh(self):
+        """
+        Load tokens revoked since the last reload, periodically forgetting expired ones
+        :return: None
+        """
+        from app.models import RevokedTokenModel
+
+        with self._lock:
+            self._load(RevokedTokenModel)
+            if time.monotonic() >= self._next_purge:
+                self._purge_database(RevokedTokenModel)
+                now = time.time()
+                self._revoked = {jti: expires for jti, expires in self._revoked.items() if expires > now}
+                self._rebuild_bloom()
+
+    def stats(self):
+        """
+        Return cache counters
+        :return: dict with number of remembered revoked tokens
+        """
+        return {"revoked_tokens": len(self._revoked), "bloom_bits": self._bloom.size}
+
+    def _load(self, model):
+        for id_, jti, blacklisted_on in model.find_revoked_after(self._last_id):
+            revoked_at = blacklisted_on.replace(tzinfo=timezone.utc).timestamp()
+            self._remember(jti, self._expires_from(revoked_at))
+            self._last_id = max(self._last_id, id_)
+        self._next_refresh = time.monotonic() + self.refresh_interval
+
+    def _purge_database(self, model):
+        if self.max_token_lifetime is not None:
+            model.delete_revoked_before(time.time() - self.max_token_lifetime)
+        self._next_purge = time.monotonic() + self.purge_interval
+
+    def _remember(self, jti, expires):
+        self._revoked[jti] = max(expires, self._revoked.get(jti, 0))
+        if len(self._revoked) > self._bloom.capacity:
+            self._rebuild_bloom()
+        else:
+            self._bloom.add(jti)
+
+    def _rebuild_bloom(self):
+        bloom = BloomFilter(max(self.capacity, len(self._revoked) * 2), self.error_rate)
+        for jti in self._revoked:
+            bloom.add(jti)
+        self._bloom = bloom
+
+    def _expires_from(self, revoked_at):
+        if self.max_token_lifetime is None:
+            return math.inf
+        return revoked_at + self.max_token_lifetime
+
+
+revocation_cache = RevocationCache()
@@ -0,0 +1,77 @@
+import csv
+import io
+import json
+
+from flask import request, jsonify
+
+from config import Config
+
+
+JSON_LINES_MIMETYPES = ("application/x-ndjson", "application/jsonl", "application/x-jsonlines",
+                        "application/json-lines")
+
+
+def read_rows():
+    """
+    Read rows of bulk import from request body in CSV (with header) or JSON Lines format
+    :return: list of tuples (row number, dict), raises ValueError on invalid body
+    """
+    body = request.get_data(as_text=True)
+    if request.mimetype == "text/csv":
+        rows = list(enumerate(csv.DictReader(io.StringIO(body)), 1))
+    elif request.mimetype in JSON_LINES_MIMETYPES:
+        rows = []
+        for number, line in enumerate(body.splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                raise ValueError(f"Row {number}: invalid JSON.")
+            if not isinstance(row, dict):
+                raise ValueError(f"Row {number}: JSON object expected.")
+            rows.append((number, row))
+    else:
+        raise ValueError('Please, send rows as "text/csv" or "application/x-ndjson".')
+
+    if not rows:
+        raise ValueError("No rows to import.")
+    if len(rows) > Config.BULK_IMPORT_MAX_ROWS:
+        raise ValueError(f"Too many rows, at most {Config.BULK_IMPORT_MAX_ROWS} are allowed.")
+    return rows
+
+
+def parse_bool(value):
+    """
+    Parse boolean of JSON or CSV row
+    :param value: bool or string
+    :return: True, False or None if value is not a boolean
+    """
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str):
+        return {"true": True, "1": True, "false": False, "0": False}.get(value.strip().lower())
+    return None
+
+
+def chunks(values, size=500):
+    """
+    Split values into lists of at most size items, keeps IN (...) clauses under database limits
+    :param values: iterable
+    :param size: chunk size
+    :return: generator of lists
+    """
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def bulk_response(inserted, errors):
+    """
+    Build response of bulk import
+    :param inserted: number of inserted rows
+    :param errors: list of dicts {"row": number, "message": text}
+    :return: json with number of inserted rows and per-row errors, status 201 or 400 if nothing was inserted
+    """
+    errors = sorted(errors, key=lambda error: error["row"])
+    return jsonify({"inserted": inserted, "errors": errors}), 201 if inserted else 400
@@ -0,0 +1,228 @@
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+
+from config import Config
+
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Thread-safe bounded LRU cache whose entries also expire after ttl seconds.
+    Every entry is tagged with names of the tables its value was built from,
+    so writes to a table can drop only the entries which depend on it.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def get(self, key, default=None):
+        """
+        Get cached value by key
+        :param key: cache key
+        :param default: value returned on miss
+        :return: cached value or default
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at, _ = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    @property
+    def generation(self):
+        """
+        Counter which changes on every invalidation
+        """
+        return self._generation
+
+    def set(self, key, value, tags=(), generation=None):
+        """
+        Put value to cache, evicting least recently used entries when cache is full
+        :param key: cache key
+        :param value: value to cache
+        :param tags: names of tables the value depends on
+        :param generation: if given and cache was invalidated since that generation, value is
+            considered stale and is not stored
+        :return: None
+        """
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            self._entries[key] = (value, time.monotonic() + self.ttl, frozenset(tags))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, *tags):
+        """
+        Drop all entries which depend on any of given tables
+        :param tags: table names
+        :return: None
+        """
+        tags = set(tags)
+        with self._lock:
+            stale = [key for key, (_, _, entry_tags) in self._entries.items() if entry_tags & tags]
+            for key in stale:
+                del self._entries[key]
+            self.invalidations += len(stale)
+            self._generation += 1
+
+    def clear(self):
+        """
+        Drop all entries
+        :return: None
+        """
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def stats(self):
+        """
+        Return cache counters
+        :return: dict with cache counters
+        """
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+    def cached(self, *tags, tags_from=None):
+        """
+        Decorator which caches dict results of model classmethods. Calls with to_dict=False, given
+        by position or by name, return model instances bound to the session and are never cached.
+        Calls are keyed by their bound arguments, so positional and keyword forms share an entry.
+        :param tags: names of tables the result depends on
+        :param tags_from: function returning names of tables the result depends on from dict of
+            arguments of the call (defaults included), used when they depend on the arguments
+        """
+        def decorator(func):
+            signature = inspect.signature(func)
+
+            @functools.wraps(func)
+            def wrapper(cls, *args, **kwargs):
+                arguments = signature.bind(cls, *args, **kwargs)
+                arguments.apply_defaults()
+                if not arguments.arguments.get("to_dict", True):
+                    return func(cls, *args, **kwargs)
+                key = (cls.__name__, func.__name__, tuple(arguments.arguments.items())[1:])
+                generation = self.generation
+                result = self.get(key, _MISSING)
+                if result is _MISSING:
+                    result = func(cls, *args, **kwargs)
+                    entry_tags = tags if tags_from is None else tags_from(arguments.arguments)
+                    self.set(key, result, entry_tags, generation=generation)
+                return result
+            return wrapper
+        return decorator
+
+
+class TableVersionCache:
+    """
+    Versions of tables (rows of table_versions) this process has seen, reused for ttl seconds, so
+    conditional GETs in a burst share one lookup. The read cache is invalidated by writes of this
+    process only, so when a version seen here moves forward - the table was changed by another
+    process - entries of the read cache tagged with that table are dropped before they can be
+    sent under the new version.
+    """
+
+    def __init__(self, ttl, read_cache):
+        self.ttl = ttl
+        self.read_cache = read_cache
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def get(self, table_names):
+        """
+        Get versions of tables seen less than ttl seconds ago
+        :param table_names: names of tables
+        :return: dict table name -> (version, updated_on), None if any of the tables has to be looked up
+        """
+        now = time.monotonic()
+        with self._lock:
+            entries = [self._versions.get(name) for name in table_names]
+        if any(entry is None or entry[2] <= now for entry in entries):
+            return None
+        return {name: entry[:2] for name, entry in zip(table_names, entries)}
+
+    def update(self, versions):
+        """
+        Remember versions looked up in the database, dropping read cache entries of tables seen
+        for the first time or whose version moved forward
+        :param versions: dict table name -> (version, updated_on)
+        :return: dict table name -> (version, updated_on), never older than versions seen before
+        """
+        expires_at = time.monotonic() + self.ttl
+        changed = []
+        with self._lock:
+            for name, (version, updated_on) in versions.items():
+                seen = self._versions.get(name)
+                if seen is not None and seen[0] > version:
+                    # looked up before a newer version another thread has already seen
+                    continue
+                if seen is None or seen[0] < version:
+                    changed.append(name)
+                self._versions[name] = (version, updated_on, expires_at)
+            current = {name: self._versions[name][:2] for name in versions}
+        if changed:
+            self.read_cache.invalidate(*changed)
+        return current
+
+    def expire(self, *table_names):
+        """
+        Make the next request look up versions of tables again, e.g. after this process changed them
+        :param table_names: names of tables
+        :return: None
+        """
+        with self._lock:
+            for name in table_names:
+                if name in self._versions:
+                    version, updated_on, _ = self._versions[name]
+                    self._versions[name] = (version, updated_on, 0)
+
+
+def invalidate_tables(*tables):
+    """
+    Drop cached reads of tables changed by this process and look up their versions again,
+    called after the change is committed
+    :param tables: names of changed tables
+    :return: None
+    """
+    read_cache.invalidate(*tables)
+    table_versions.expire(*tables)
+
+
+read_cache = TTLCache(Config.READ_CACHE_SIZE, Config.READ_CACHE_TTL)
+table_versions = TableVersionCache(Config.TABLE_VERSIONS_TTL, read_cache)
@@ -0,0 +1,125 @@
+import bisect
+import threading
+from datetime import date
+
+
+class TodayChoicesIndex:
+    """
+    In-memory index of today's choices: employee id -> (choice id, menu id) and sorted choice ids.
+    It's loaded from the database on first use and at midnight and kept current by choice writes of
+    this process. It remembers the version of the choices table it reflects: a write of this process
+    which made the next version moves the index to it, any other change of the version - a write
+    of another process - reloads the index on next use.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._day = None
+        self._version = None
+        self._by_employee = {}
+        self._choices = {}
+        self._ids = []
+
+    def get(self, employee_id):
+        """
+        Find today's choice of employee
+        :param employee_id: employee id
+        :return: tuple (choice id, menu id) or None
+        """
+        self._ensure_current()
+        return self._by_employee.get(employee_id)
+
+    def page(self, after_id, limit=None):
+        """
+        Return ids of today's choices in ascending order
+        :param after_id: keyset cursor, only ids greater than after_id are returned
+        :param limit: max number of ids, None - no limit
+        :return: list of choice ids
+        """
+        self._ensure_current()
+        with self._lock:
+            start = bisect.bisect_right(self._ids, after_id)
+            return self._ids[start:] if limit is None else self._ids[start:start + limit]
+
+    def track(self, choice_id, employee_id, menu_id, day, version=None):
+        """
+        Remember created or updated choice
+        :param choice_id: choice id
+        :param employee_id: employee id
+        :param menu_id: menu id
+        :param day: date of choice
+        :param version: version of the choices table made by the write, None - unknown
+        :return: None
+        """
+        with self._lock:
+            self._forget(choice_id)
+            if day == self._day:
+                self._remember(choice_id, employee_id, menu_id)
+            self._follow(version)
+
+    def discard(self, choice_id, version=None):
+        """
+        Forget deleted choice
+        :param choice_id: choice id
+        :param version: version of the choices table made by the delete, None - unknown
+        :return: None
+        """
+        with self._lock:
+            self._forget(choice_id)
+            self._follow(version)
+
+    def invalidate(self):
+        """
+        Reload index on next use, e.g. after choices were deleted in bulk
+        :return: None
+        """
+        self._version = None
+
+    def _follow(self, version):
+        # writes of this process are already applied, unless another write came in between
+        if version is not None and self._version is not None and version == self._version + 1:
+            self._version = version
+
+    def _ensure_current(self):
+        from app.models import TableVersionModel
+
+        (version,), _ = TableVersionModel.find_versions(("choices",))
+        if self._day != date.today() or self._version != version:
+            self._reload(version)
+
+    def _reload(self, version):
+        from app.models import ChoicesModel
+
+        with self._lock:
+            today = date.today()
+            self._day = today
+            self._by_employee = {}
+            self._choices = {}
+            self._ids = []
+            # rows are read after the version, so they reflect at least that version
+            for choice_id, employee_id, menu_id in ChoicesModel.find_day_index(today):
+                self._remember(choice_id, employee_id, menu_id)
+            self._version = version
+
+    def _remember(self, choice_id, employee_id, menu_id):
+        bisect.insort(self._ids, choice_id)
+        self._choices[choice_id] = (employee_id, menu_id)
+        current = self._by_employee.get(employee_id)
+        # of duplicated choices the earliest one is the employee's choice
+        if current is None or current[0] > choice_id:
+            self._by_employee[employee_id] = (choice_id, menu_id)
+
+    def _forget(self, choice_id):
+        entry = self._choices.pop(choice_id, None)
+        if entry is None:
+            return
+        employee_id = entry[0]
+        del self._ids[bisect.bisect_left(self._ids, choice_id)]
+        if self._by_employee[employee_id][0] == choice_id:
+            del self._by_employee[employee_id]
+            others = [(id_, menu_id) for id_, (owner, menu_id) in self._choices.items() if owner == employee_id]
+            if others:
+                self._by_employee[employee_id] = min(others)
+
+
+today_choices = TodayChoicesIndex()
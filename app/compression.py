@@ -0,0 +1,169 @@
+import gzip
+import mimetypes
+import os
+
+from flask import request, send_from_directory
+from werkzeug.security import safe_join
+
+from config import Config
+from app.cache import TTLCache
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = ("application/json", "application/javascript", "application/x-yaml", "image/svg+xml")
+# file suffixes of precompressed static files
+SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+class ResponseCompressor:
+    """
+    Compresses response bodies with brotli or gzip, whichever the client accepts and prefers
+    (brotli only when the brotli package is installed). Compressed bodies of responses with
+    a strong ETag are cached by the ETag and encoding, so a representation is compressed once.
+    """
+
+    def __init__(self, min_size, level, brotli_quality, cache_size, cache_ttl):
+        self.min_size = min_size
+        self.level = level
+        self.brotli_quality = brotli_quality
+        self.cache = TTLCache(cache_size, cache_ttl)
+
+    @property
+    def encodings(self):
+        """
+        Encodings this process can produce, preferred first
+        """
+        return ("br", "gzip") if brotli is not None else ("gzip",)
+
+    def negotiate(self, accept_encodings):
+        """
+        Choose encoding for the client
+        :param accept_encodings: werkzeug Accept header of the request
+        :return: "br", "gzip" or None - send the body as it is
+        """
+        best = accept_encodings.best_match(self.encodings)
+        return best if best and accept_encodings[best] else None
+
+    def compress(self, data, encoding):
+        """
+        Compress data
+        :param data: bytes
+        :param encoding: "br" or "gzip"
+        :return: compressed bytes
+        """
+        if encoding == "br":
+            return brotli.compress(data, quality=self.brotli_quality)
+        # mtime=0 keeps output of the same data the same
+        return gzip.compress(data, compresslevel=self.level, mtime=0)
+
+    @staticmethod
+    def compressible(response):
+        mimetype = response.mimetype or ""
+        return mimetype.startswith("text/") or mimetype in COMPRESSIBLE_MIMETYPES
+
+    def compress_response(self, response):
+        """
+        Compress body of a complete 200 response when it's big enough and the client accepts compression.
+        Its strong ETag is made weak, as it's the same for every encoding of the body.
+        :param response: response
+        :return: the same response
+        """
+        if response.status_code != 200 or response.direct_passthrough or response.is_streamed \
+                or "Content-Encoding" in response.headers or not self.compressible(response):
+            return response
+        response.vary.add("Accept-Encoding")
+        encoding = self.negotiate(request.accept_encodings)
+        if encoding is None or response.content_length is not None and response.content_length < self.min_size:
+            return response
+        data = response.get_data()
+        if len(data) < self.min_size:
+            return response
+
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            key = (etag, encoding)
+            compressed = self.cache.get(key)
+            if compressed is None:
+                compressed = self.compress(data, encoding)
+                self.cache.set(key, compressed)
+            response.set_etag(etag, weak=True)
+        else:
+            compressed = self.compress(data, encoding)
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+    def precompress_static(self, folder):
+        """
+        Write brotli and gzip copies next to compressible static files, skipping the up-to-date ones
+        :param folder: static folder
+        :return: list of written paths
+        """
+        written = []
+        for root, _, files in os.walk(folder):
+            for name in files:
+                if name.endswith(tuple(SUFFIXES.values())) or not self.compressible_file(name):
+                    continue
+                path = os.path.join(root, name)
+                data = None
+                for encoding in self.encodings:
+                    target = path + SUFFIXES[encoding]
+                    if os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+                        continue
+                    if data is None:
+                        with open(path, "rb") as file:
+                            data = file.read()
+                    # written aside and renamed, so other workers never send a partly written copy
+                    with open(target + ".tmp", "wb") as file:
+                        file.write(self.compress(data, encoding))
+                    os.replace(target + ".tmp", target)
+                    written.append(target)
+        return written
+
+    @staticmethod
+    def file_mimetype(name):
+        """
+        Guess mimetype of static file, YAML (unknown to mimetypes module) included
+        :param name: file name
+        :return: mimetype or None
+        """
+        if name.endswith((".yaml", ".yml")):
+            return "application/x-yaml"
+        return mimetypes.guess_type(name)[0]
+
+    @classmethod
+    def compressible_file(cls, name):
+        mimetype = cls.file_mimetype(name) or ""
+        return mimetype.startswith("text/") or mimetype in COMPRESSIBLE_MIMETYPES
+
+    def send_static_file(self, folder, filename, max_age=None):
+        """
+        Send static file, or its precompressed copy when the client accepts its encoding
+        and the copy is not older than the file
+        :param folder: static folder
+        :param filename: path of the file inside the folder
+        :param max_age: max-age of Cache-Control header, seconds
+        :return: response
+        """
+        path = safe_join(folder, filename)
+        if path is None or not self.compressible_file(filename) or not os.path.isfile(path):
+            return send_from_directory(folder, filename, max_age=max_age)
+        mimetype = self.file_mimetype(filename)
+        encoding = self.negotiate(request.accept_encodings)
+        target = encoding and path + SUFFIXES[encoding]
+        if target and os.path.isfile(target) and os.path.getmtime(target) >= os.path.getmtime(path):
+            response = send_from_directory(folder, filename + SUFFIXES[encoding], mimetype=mimetype, max_age=max_age)
+            if response.status_code in (200, 206):
+                response.headers["Content-Encoding"] = encoding
+        else:
+            response = send_from_directory(folder, filename, mimetype=mimetype, max_age=max_age)
+        response.vary.add("Accept-Encoding")
+        return response
+
+
+compressor = ResponseCompressor(Config.COMPRESSION_MIN_SIZE, Config.COMPRESSION_LEVEL,
+                                Config.COMPRESSION_BROTLI_QUALITY, Config.COMPRESSION_CACHE_SIZE,
+                                Config.COMPRESSION_CACHE_TTL)
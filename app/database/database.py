@@ -1,18 +1,88 @@
-from sqlalchemy import create_engine
+import os
+import time
+
+from flask import g, has_request_context
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, scoped_session
 
 from app.main import Config
+from app.metrics import metrics
 
 
 db_string = Config.SQLALCHEMY_DATABASE_URI
 
-db = create_engine(db_string)
+
+def engine_options(url):
+    """
+    Build create_engine keyword arguments for the connection pool from Config
+    :param url: database url
+    :return: dict of create_engine options
+    """
+    options = {
+        "pool_pre_ping": Config.SQLALCHEMY_POOL_PRE_PING,
+        "pool_recycle": Config.SQLALCHEMY_POOL_RECYCLE,
+    }
+    # sqlite uses single connection / per-thread pools which don't take size limits
+    if make_url(url).get_backend_name() != "sqlite":
+        options.update(
+            pool_size=Config.SQLALCHEMY_POOL_SIZE,
+            max_overflow=Config.SQLALCHEMY_MAX_OVERFLOW,
+            pool_timeout=Config.SQLALCHEMY_POOL_TIMEOUT,
+        )
+    return options
+
+
+db = create_engine(db_string, **engine_options(db_string))
+
+
+@event.listens_for(db, "before_cursor_execute")
+def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    conn.info["query_started"] = time.perf_counter()
+
+
+@event.listens_for(db, "after_cursor_execute")
+def record_query_time(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info.pop("query_started", time.perf_counter())
+    # the counters live on flask.g, so statements run outside of a request are not attributed to any
+    if has_request_context():
+        g.query_count = g.get("query_count", 0) + 1
+        g.db_time = g.get("db_time", 0.0) + elapsed
+
+
+def _timed_checkout(connect):
+    def checkout():
+        started = time.perf_counter()
+        try:
+            return connect()
+        finally:
+            metrics.pool_wait.observe(time.perf_counter() - started)
+    return checkout
+
+
+def _instrument_pool():
+    # pool checkout is wrapped rather than observed through pool events,
+    # which only fire once a connection has already been handed out
+    db.pool.connect = _timed_checkout(db.pool.connect)
+
+
+def _reset_pool_after_fork():
+    # connections opened before a fork (startup warm-up of a preloading server) must not be shared
+    # with worker processes, children start with an empty pool and leave parent's connections alone;
+    # dispose replaces the pool, so its checkout is wrapped again
+    db.dispose(close=False)
+    _instrument_pool()
+
+
+_instrument_pool()
+os.register_at_fork(after_in_child=_reset_pool_after_fork)
 Session = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=db))
 
 
 base = declarative_base()
 
-# Session = sessionmaker(db)
 base.query = Session.query_property()
-session = Session()
\ No newline at end of file
+# thread-local session registry: every request thread works with its own session,
+# which is removed when the request's app context is torn down
+session = Session
@@ -0,0 +1,109 @@
+from datetime import datetime
+
+from sqlalchemy import MetaData, Table, Column, Integer, String, DateTime, select, text, func, true, false, inspect
+
+from app.menu_search import MenuSearch
+
+
+metadata = MetaData()
+
+schema_migrations = Table(
+    "schema_migrations", metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String(200), nullable=False),
+    Column("applied_on", DateTime, default=datetime.utcnow),
+)
+
+
+# (version, description, statements) - append only, applied migrations must never change.
+# New databases get the same schema from models through base.metadata.create_all,
+# so every statement has to be a no-op when the object already exists.
+# {true} and {false} are replaced with boolean literals of the database dialect.
+# Statements may be given per dialect name as a dict, other dialects skip the migration.
+MIGRATIONS = [
+    (1, "Index hot lookup columns", [
+        "CREATE INDEX IF NOT EXISTS ix_employees_email ON employees (email)",
+        "CREATE INDEX IF NOT EXISTS ix_employees_name ON employees (firstname, lastname)",
+        "CREATE INDEX IF NOT EXISTS ix_choices_employee_id_current_day ON choices (employee_id, current_day)",
+        "CREATE INDEX IF NOT EXISTS ix_choices_current_day ON choices (current_day, id)",
+        "CREATE INDEX IF NOT EXISTS ix_choices_menu_id ON choices (menu_id)",
+        "CREATE INDEX IF NOT EXISTS ix_revoked_tokens_jti ON revoked_tokens (jti)",
+        "CREATE INDEX IF NOT EXISTS ix_restaurant_name ON restaurant (name)",
+        # menu.restaurant_id is already indexed by its unique constraint
+    ]),
+    (2, "Partial indexes of active and inactive employees", [
+        "CREATE INDEX IF NOT EXISTS ix_employees_active ON employees (id) WHERE is_active = {true}",
+        "CREATE INDEX IF NOT EXISTS ix_employees_inactive ON employees (id) WHERE is_active = {false}",
+    ]),
+    (3, "Full-text index of menus", {
+        "sqlite": [
+            "CREATE VIRTUAL TABLE IF NOT EXISTS menu_search USING fts5("
+            "menu_id UNINDEXED, restaurant_id UNINDEXED, day UNINDEXED, restaurant, dishes)",
+            "DELETE FROM menu_search",
+            MenuSearch.rows_statement("sqlite"),
+        ],
+        "postgresql": [
+            "CREATE TABLE IF NOT EXISTS menu_search (rowid bigint PRIMARY KEY, menu_id integer NOT NULL, "
+            "restaurant_id integer, day varchar(10) NOT NULL, restaurant varchar(120) NOT NULL, "
+            "dishes varchar(500) NOT NULL, document tsvector NOT NULL)",
+            "CREATE INDEX IF NOT EXISTS ix_menu_search_document ON menu_search USING GIN (document)",
+            "DELETE FROM menu_search",
+            MenuSearch.rows_statement("postgresql"),
+        ],
+    }),
+    (4, "One choice per employee and day", [
+        # the earliest choice of an employee for a day is the one the API has been reporting
+        "DELETE FROM choices WHERE employee_id IS NOT NULL AND current_day IS NOT NULL AND id NOT IN "
+        "(SELECT min(id) FROM choices GROUP BY employee_id, current_day)",
+        "DELETE FROM choice_tally",
+        "INSERT INTO choice_tally (current_day, menu_id, count) SELECT current_day, menu_id, count(id) "
+        "FROM choices WHERE current_day IS NOT NULL AND menu_id IS NOT NULL GROUP BY current_day, menu_id",
+        "CREATE UNIQUE INDEX IF NOT EXISTS uq_choices_employee_id_current_day ON choices (employee_id, current_day)",
+        "DROP INDEX IF EXISTS ix_choices_employee_id_current_day",
+    ]),
+]
+
+
+def current_version(connection):
+    """
+    Return version of the last applied migration
+    :param connection: database connection
+    :return: version number, 0 if nothing was applied
+    """
+    return connection.execute(select(func.coalesce(func.max(schema_migrations.c.version), 0))).scalar()
+
+
+def pending(engine):
+    """
+    Return versions of migrations which were not applied to the database yet
+    :param engine: database engine
+    :return: list of versions
+    """
+    with engine.connect() as connection:
+        applied = current_version(connection) if inspect(connection).has_table(schema_migrations.name) else 0
+    return [version for version, _, _ in MIGRATIONS if version > applied]
+
+
+def upgrade(engine):
+    """
+    Apply migrations which were not applied to the database yet, each in its own transaction
+    :param engine: database engine
+    :return: list of applied versions
+    """
+    metadata.create_all(engine)
+    literals = {
+        "true": str(true().compile(dialect=engine.dialect)),
+        "false": str(false().compile(dialect=engine.dialect)),
+    }
+    applied = []
+    for version, description, statements in MIGRATIONS:
+        with engine.begin() as connection:
+            if version <= current_version(connection):
+                continue
+            if isinstance(statements, dict):
+                statements = statements.get(engine.dialect.name, [])
+            for statement in statements:
+                connection.execute(text(statement.format(**literals)))
+            connection.execute(schema_migrations.insert().values(version=version, description=description))
+        applied.append(version)
+    return applied
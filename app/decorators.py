@@ -1,5 +1,14 @@
+import hashlib
+import math
+from datetime import timezone
+
+from flask import current_app, make_response, request, jsonify
 from flask_jwt_extended import get_jwt
 
+from config import Config
+from app.models import TableVersionModel, graph_tables
+from app.fieldsets import get_fieldset_args
+
 
 def admin_group_required(func):
     """
@@ -13,4 +22,88 @@ def admin_group_required(func):
         result = func(*args, **kwargs)
         return result
     wrapper.__name__ = func.__name__
-    return wrapper
\ No newline at end of file
+    return wrapper
+
+
+def conditional_get(*tables, key=None):
+    """
+    Decorator which answers GET requests with strong ETag and Last-Modified built from versions
+    of the tables the response is made of, and returns 304 without calling the function when
+    the client already has the current representation
+    :param tables: names of tables the response depends on, or one function returning them for
+        the current request; when it raises ValueError (invalid query) the function is just called
+    :param key: function returning other state the response depends on (e.g. current date), it's
+        added to ETag and Last-Modified is not sent, as it can't reflect that state
+    """
+    def decorator(func):
+        def wrapper(*args, **kwargs):
+            if len(tables) == 1 and callable(tables[0]):
+                try:
+                    names = tables[0]()
+                except ValueError:
+                    return func(*args, **kwargs)
+            else:
+                names = tables
+            versions, last_modified = TableVersionModel.find_versions(names)
+            etag = hashlib.sha1(repr((request.full_path, versions, key and key())).encode()).hexdigest()
+            if key is not None:
+                last_modified = None
+            if last_modified is not None:
+                last_modified = last_modified.replace(tzinfo=timezone.utc, microsecond=0)
+
+            if request.if_none_match:
+                not_modified = request.if_none_match.contains_weak(etag)
+            else:
+                not_modified = bool(last_modified and request.if_modified_since
+                                    and last_modified <= request.if_modified_since)
+
+            response = make_response("", 304) if not_modified else make_response(func(*args, **kwargs))
+            if response.status_code in (200, 304):
+                response.set_etag(etag)
+                response.last_modified = last_modified
+                response.cache_control.no_cache = True
+            return response
+        wrapper.__name__ = func.__name__
+        return wrapper
+    return decorator
+
+
+def expanded_tables(model, default_expand=None):
+    """
+    Build function for conditional_get returning tables read for restaurant or menu representations
+    with relations expanded by "expand" query parameter of the current request
+    :param model: RestaurantModel or MenusModel
+    :param default_expand: relations expanded when "expand" isn't given, all of model's EXPANSIONS by default
+    :return: function
+    """
+    return lambda: graph_tables(get_fieldset_args(model, default_expand)[1])
+
+
+def _too_many_requests(retry_after):
+    response = make_response(jsonify({"message": "Too many requests, please retry later"}), 429)
+    response.headers["Retry-After"] = str(math.ceil(retry_after))
+    return response
+
+
+def hashing_admission(func):
+    """
+    Decorator for endpoints which hash passwords: the request takes a token from rate limit buckets
+    of the client's IP and of the email in its body, and a slot of the hashing concurrency cap.
+    Otherwise it's answered with 429 and Retry-After without calling the function.
+    """
+    def wrapper(*args, **kwargs):
+        limits = current_app.extensions["auth_limits"]
+        body = request.get_json(silent=True)
+        email = body.get("email") if isinstance(body, dict) else None
+        wait = limits.wait(request.remote_addr, email if isinstance(email, str) else None)
+        if wait:
+            return _too_many_requests(wait)
+        if not limits.hashing.acquire():
+            limits.reject("hashing")
+            return _too_many_requests(Config.HASH_RETRY_AFTER_SECONDS)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            limits.hashing.release()
+    wrapper.__name__ = func.__name__
+    return wrapper
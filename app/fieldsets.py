@@ -0,0 +1,72 @@
+from flask import request
+from sqlalchemy.orm import load_only
+
+
+def _names(value):
+    return tuple(sorted({name.strip() for name in value.split(",") if name.strip()}))
+
+
+def get_fieldset_args(model, default_expand=None):
+    """
+    Read "fields" and "expand" query parameters of the current request
+    :param model: model class, its FIELDS and EXPANSIONS list accepted names
+    :param default_expand: relations expanded when "expand" isn't given, all of model's EXPANSIONS by default
+    :return: tuple (fields, expand): sorted tuple of attribute names or None for all attributes and
+        sorted tuple of dotted relation paths; raises ValueError on unknown names
+    """
+    fields = request.args.get("fields")
+    if fields is not None:
+        fields = _names(fields)
+        unknown = set(fields) - set(model.FIELDS)
+        if unknown:
+            raise ValueError(f'Unknown fields: {", ".join(sorted(unknown))}. '
+                             f'Available fields: {", ".join(model.FIELDS)}.')
+        # id is always returned, pages are continued from it
+        fields = tuple(sorted(set(fields) | {"id"}))
+
+    expand = request.args.get("expand")
+    if expand is None:
+        return fields, tuple(sorted(model.EXPANSIONS if default_expand is None else default_expand))
+    expand = _names(expand)
+    unknown = set(expand) - set(model.EXPANSIONS)
+    if unknown:
+        raise ValueError(f'Unknown relations: {", ".join(sorted(unknown))}. '
+                         f'Available relations: {", ".join(model.EXPANSIONS)}.')
+    # expanding a nested relation expands its parents
+    paths = {".".join(path.split(".")[:depth]) for path in expand for depth in range(1, path.count(".") + 2)}
+    return fields, tuple(sorted(paths))
+
+
+def select_fields(instance, names, fields):
+    """
+    Read requested attributes of model instance, the others are not touched, so columns
+    left out of the query by load_fields are not loaded
+    :param instance: model instance
+    :param names: attributes of the representation, in order
+    :param fields: names of attributes to keep, None - keep all
+    :return: dict
+    """
+    return {name: getattr(instance, name) for name in names if fields is None or name in fields}
+
+
+def load_fields(model, fields):
+    """
+    Loader options which fetch only columns of requested attributes (and the primary key)
+    :param model: model class
+    :param fields: names of requested attributes, None - all
+    :return: tuple of loader options
+    """
+    if fields is None:
+        return ()
+    return (load_only(*[getattr(model, name) for name in model.__mapper__.columns.keys() if name in fields]),)
+
+
+def nested(expand, relation):
+    """
+    Relations to expand inside of expanded relation
+    :param expand: dotted relation paths
+    :param relation: name of expanded relation
+    :return: tuple of relation paths relative to the relation
+    """
+    prefix = relation + "."
+    return tuple(path[len(prefix):] for path in expand if path.startswith(prefix))
@@ -0,0 +1,136 @@
+import atexit
+import os
+import queue
+import threading
+import time
+from collections import defaultdict, namedtuple
+from concurrent.futures import Future
+from datetime import date
+
+from config import Config
+from app.database.database import Session
+from app.models import ChoicesModel
+
+
+_STOP = object()
+
+Submission = namedtuple("Submission", ["day", "employee_id", "menu_id", "future"])
+
+
+class ChoiceWriter:
+    """
+    Write-behind queue for new choices. Request threads submit validated choices and wait,
+    a writer thread saves everything submitted within interval seconds in one transaction,
+    so a lunch rush costs one commit per batch instead of one per request.
+    """
+
+    def __init__(self, enabled, interval, max_batch, timeout):
+        self.enabled = enabled
+        self.interval = interval
+        self.max_batch = max_batch
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        atexit.register(self.shutdown)
+
+    def configure(self, enabled=None, interval=None, max_batch=None):
+        """
+        Change writer settings, pending choices are flushed first
+        :param enabled: if True - choices are saved in batches, if False - by request threads
+        :param interval: seconds to collect a batch for
+        :param max_batch: max number of choices in one transaction
+        :return: None
+        """
+        self.shutdown()
+        if enabled is not None:
+            self.enabled = enabled
+        if interval is not None:
+            self.interval = interval
+        if max_batch is not None:
+            self.max_batch = max_batch
+
+    def submit(self, employee_id, menu_id, day=None):
+        """
+        Save choice in the next batch and wait until it is committed
+        :param employee_id: employee id
+        :param menu_id: menu id
+        :param day: date of choice, today by default
+        :return: id of new choice or None if employee has already chosen for the day,
+            raises concurrent.futures.TimeoutError if it isn't committed within timeout seconds
+        """
+        future = Future()
+        self._ensure_thread()
+        self._queue.put(Submission(day or date.today(), employee_id, menu_id, future))
+        return future.result(timeout=self.timeout)
+
+    def shutdown(self):
+        """
+        Flush pending choices and stop writer thread
+        :return: None
+        """
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                self._queue.put(_STOP)
+                self._thread.join()
+            self._thread = None
+
+    def _ensure_thread(self):
+        with self._lock:
+            # threads are not inherited by forked web workers
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._thread = threading.Thread(target=self._run, name="choice-writer", daemon=True)
+                self._pid = os.getpid()
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            submission = self._queue.get()
+            if submission is _STOP:
+                return
+            batch = [submission]
+            deadline = time.monotonic() + self.interval
+            while len(batch) < self.max_batch:
+                try:
+                    submission = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+                except queue.Empty:
+                    break
+                if submission is _STOP:
+                    self._flush(batch)
+                    return
+                batch.append(submission)
+            self._flush(batch)
+
+    def _flush(self, batch):
+        by_day = defaultdict(list)
+        for submission in batch:
+            by_day[submission.day].append(submission)
+        for day, submissions in by_day.items():
+            try:
+                ids = ChoicesModel.create_for_day(day, [(s.employee_id, s.menu_id) for s in submissions])
+            except Exception:
+                Session.rollback()
+                # one bad choice fails the whole transaction, so its choices are saved one by one
+                # and only the bad one gets the error
+                for submission in submissions:
+                    self._flush_one(submission)
+            else:
+                for submission, id_ in zip(submissions, ids):
+                    submission.future.set_result(id_)
+            finally:
+                Session.remove()
+
+    def _flush_one(self, submission):
+        try:
+            id_, = ChoicesModel.create_for_day(submission.day, [(submission.employee_id, submission.menu_id)])
+        except Exception as e:
+            Session.rollback()
+            submission.future.set_exception(e)
+        else:
+            submission.future.set_result(id_)
+
+
+choice_writer = ChoiceWriter(Config.CHOICE_GROUP_COMMIT, Config.CHOICE_GROUP_COMMIT_INTERVAL_MS / 1000,
+                             Config.CHOICE_GROUP_COMMIT_MAX_BATCH, Config.CHOICE_GROUP_COMMIT_TIMEOUT_SECONDS)
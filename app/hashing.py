@@ -0,0 +1,146 @@
+import math
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from passlib.hash import pbkdf2_sha256
+
+from config import Config
+
+
+def _hash(password, rounds):
+    return pbkdf2_sha256.using(rounds=rounds).hash(password)
+
+
+def _verify(password, hashed):
+    return pbkdf2_sha256.verify(password, hashed)
+
+
+def _ready():
+    return os.getpid()
+
+
+class HashingPool:
+    """
+    Bounded process pool for PBKDF2 password hashing, sized separately from web workers,
+    so a login storm doesn't pin request threads. With size 0 hashing runs inline.
+    """
+
+    def __init__(self, size, rounds, timeout):
+        self.size = size
+        self.rounds = rounds
+        self.timeout = timeout
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._master_pid = None
+
+    def configure(self, size=None, rounds=None):
+        """
+        Change pool settings, the running pool is shut down and recreated on next use
+        :param size: number of worker processes, 0 - hash inline
+        :param rounds: PBKDF2 rounds for new hashes
+        :return: None
+        """
+        if size is not None and size != self.size:
+            self.shutdown()
+            self.size = size
+        if rounds is not None:
+            self.rounds = rounds
+
+    def start(self):
+        """
+        Start worker processes and wait until they all run, should be called before request threads
+        are started, as forking a multi-threaded process is unsafe. Web workers forked afterwards
+        start their own pool on first use, see start_in_workers to start it right after the fork.
+        :return: None
+        """
+        if self.size <= 0:
+            return
+        executor = self._get_executor()
+        # the executor creates its processes on submit, not when it's constructed
+        futures = [executor.submit(_ready) for _ in range(self.size)]
+        for future in futures:
+            future.result(timeout=self.timeout)
+
+    def start_in_workers(self):
+        """
+        Start worker processes in every web worker forked from this process right after the fork,
+        while the web worker is still single-threaded, and none in this process. For servers which
+        create the app in a master process and fork web workers from it.
+        :return: None
+        """
+        self._master_pid = os.getpid()
+
+    def _after_fork(self):
+        # only web workers are forked from the master, hashing processes are forked from them
+        if self._master_pid is None or os.getppid() != self._master_pid:
+            return
+        # the lock may have been held by another thread of the master at the fork
+        self._lock = threading.Lock()
+        self.start()
+
+    def shutdown(self):
+        """
+        Stop worker processes
+        :return: None
+        """
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+    def hash(self, password):
+        """
+        Hash password
+        :param password: password to hash
+        :return: hashed password
+        """
+        return self._run(_hash, password, self.rounds)
+
+    def hash_many(self, passwords):
+        """
+        Hash several passwords in parallel
+        :param passwords: list of passwords
+        :return: list of hashed passwords in the same order
+        """
+        if self.size <= 0:
+            return [_hash(password, self.rounds) for password in passwords]
+        # every worker hashes its share of passwords within the usual per-hash timeout
+        timeout = self.timeout * math.ceil(len(passwords) / self.size)
+        return list(self._get_executor().map(_hash, passwords, [self.rounds] * len(passwords),
+                                             timeout=timeout, chunksize=16))
+
+    def verify(self, password, hashed):
+        """
+        Verify password with hashed one
+        :param password: imputed password
+        :param hashed: hashed password
+        :return: True or False
+        """
+        return self._run(_verify, password, hashed)
+
+    def needs_rehash(self, hashed):
+        """
+        Check if hash was made with other rounds than configured
+        :param hashed: hashed password
+        :return: True or False
+        """
+        return pbkdf2_sha256.from_string(hashed).rounds != self.rounds
+
+    def _run(self, func, *args):
+        if self.size <= 0:
+            return func(*args)
+        return self._get_executor().submit(func, *args).result(timeout=self.timeout)
+
+    def _get_executor(self):
+        with self._lock:
+            # worker processes are not inherited by forked web workers
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.size)
+                self._pid = os.getpid()
+            return self._executor
+
+
+hashing_pool = HashingPool(Config.HASH_POOL_SIZE, Config.PBKDF2_ROUNDS, Config.HASH_TIMEOUT_SECONDS)
+os.register_at_fork(after_in_child=hashing_pool._after_fork)
@@ -0,0 +1,93 @@
+from datetime import date
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+def _iso_default(o):
+    # dates go out in ISO 8601, as orjson writes them natively
+    if isinstance(o, date):
+        return o.isoformat()
+    return DefaultJSONProvider.default(o)
+
+
+class JSONList(list):
+    """
+    List of rows which keeps its serialized JSON. Cached model results are returned
+    as JSONList, so every hit of the read cache reuses bytes serialized once.
+    Like any cached value it must not be changed after it's returned.
+    """
+    __slots__ = ("json",)
+
+    def __init__(self, rows=()):
+        super().__init__(rows)
+        self.json = None
+
+
+class JSONProvider(DefaultJSONProvider):
+    """
+    JSON provider which serializes with orjson when it is installed and with stdlib json otherwise.
+    Dates and datetimes are written in ISO 8601 by both, JSONList is written from its cached bytes.
+    """
+    default = staticmethod(_iso_default)
+    ensure_ascii = False
+
+    def _orjson_option(self, indent=False):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        """
+        Serialize data as JSON to a string
+        :param obj: data to serialize
+        :param kwargs: passed to json.dumps, their presence makes stdlib json serialize the data
+        :return: str
+        """
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._orjson_option()).decode()
+
+    def dumpb(self, obj, indent=False):
+        """
+        Serialize data as JSON to UTF-8 bytes
+        :param obj: data to serialize
+        :param indent: if True - output is indented for reading
+        :return: bytes
+        """
+        if isinstance(obj, JSONList) and not indent:
+            if obj.json is None:
+                obj.json = self.dumpb(list(obj))
+            return obj.json
+        if orjson is None:
+            return super().dumps(obj, indent=2 if indent else None).encode()
+        return orjson.dumps(obj, default=self.default, option=self._orjson_option(indent))
+
+    def loads(self, s, **kwargs):
+        """
+        Deserialize data from JSON string or bytes
+        :param s: text or UTF-8 bytes
+        :param kwargs: passed to json.loads, their presence makes stdlib json deserialize the data
+        :return: data
+        """
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        """
+        Build JSON response, pre-built bytes of JSONList go to the response as they are
+        :param args: a single value to serialize, or multiple values to treat as a list
+        :param kwargs: treat as a dict to serialize
+        :return: response
+        """
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = self.compact is False or (self.compact is None and self._app.debug)
+        return self._app.response_class(self.dumpb(obj, indent) + b"\n", mimetype=self.mimetype)
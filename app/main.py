@@ -1,28 +1,181 @@
-from flask import Flask
+import time
+
+from flask import Flask, g, request
 from flask_jwt_extended import JWTManager
+from flask_jwt_extended.config import config as jwt_config
 from flask_swagger_ui import get_swaggerui_blueprint
 from flask_cors import CORS
 
 from config import Config
-from .database.database import db, base
+from .database.database import db, base, Session
+from .database.migrations import upgrade, pending
+from .json_provider import JSONProvider
 
 
 def setup_database(app):
-    with app.app_context():
-        @app.before_first_request
-        def create_tables():
-            base.metadata.create_all(db)
+    @app.cli.command("db-upgrade")
+    def db_upgrade():
+        """Create missing tables and apply pending migrations."""
+        base.metadata.create_all(db)
+        applied = upgrade(db)
+        print(f"Applied migrations: {applied}" if applied else "Database is up to date")
+
+    @app.teardown_appcontext
+    def remove_session(exception=None):
+        Session.remove()
 
 
 def setup_jwt(app):
     jwt = JWTManager(app)
 
-    from app.models import RevokedTokenModel
+    from app.blocklist import revocation_cache
+
+    with app.app_context():
+        lifetimes = [jwt_config.access_expires, jwt_config.refresh_expires]
+        max_token_lifetime = None if False in lifetimes else max(lifetimes).total_seconds()
+        revocation_cache.configure(refresh_interval=Config.JWT_BLOCKLIST_REFRESH_SECONDS,
+                                   max_token_lifetime=max_token_lifetime)
 
     @jwt.token_in_blocklist_loader
     def check_if_token_in_blacklist(jwt_header, jwt_payload):
         jti = jwt_payload['jti']
-        return RevokedTokenModel.is_jti_blacklisted(jti)
+        return revocation_cache.is_revoked(jti)
+
+
+def setup_hashing():
+    from app.hashing import hashing_pool
+
+    if Config.HASH_POOL_AFTER_FORK:
+        # a preloading server forks web workers from this process, they start their own pools
+        hashing_pool.start_in_workers()
+    else:
+        # fork hashing workers while the process is still single-threaded
+        hashing_pool.start()
+
+
+def setup_rate_limits(app):
+    # login and registration spend a PBKDF2 hash per request, their clients are limited
+    # by token buckets and the number of requests hashing at once is capped
+    from app.rate_limit import AuthLimits, MemoryBucketStore, DatabaseBucketStore
+
+    stores = {
+        "memory": lambda: MemoryBucketStore(Config.RATE_LIMIT_MEMORY_BUCKETS),
+        "database": DatabaseBucketStore,
+    }
+    if Config.RATE_LIMIT_BACKEND not in stores:
+        raise RuntimeError(f"Unknown RATE_LIMIT_BACKEND {Config.RATE_LIMIT_BACKEND!r}, "
+                           f"use one of: {', '.join(stores)}")
+    store = stores[Config.RATE_LIMIT_BACKEND]() if Config.RATE_LIMIT_ENABLED else None
+    app.extensions["auth_limits"] = AuthLimits(store, Config.RATE_LIMIT_IP_BURST,
+                                               Config.RATE_LIMIT_IP_PER_MINUTE / 60,
+                                               Config.RATE_LIMIT_EMAIL_BURST,
+                                               Config.RATE_LIMIT_EMAIL_PER_MINUTE / 60,
+                                               Config.HASH_MAX_CONCURRENT, Config.HASH_ADMISSION_WAIT_SECONDS)
+
+
+def setup_metrics(app):
+    from app.metrics import metrics
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+        g.query_count = 0
+        g.db_time = 0.0
+        metrics.in_flight.inc()
+        g.in_flight = True
+
+    @app.after_request
+    def record_request_metrics(response):
+        if "request_started" not in g:
+            return response
+        elapsed = time.perf_counter() - g.request_started
+        endpoint = request.endpoint or "unmatched"
+        metrics.request_latency.observe(elapsed, endpoint=endpoint, method=request.method,
+                                        status=response.status_code)
+        metrics.request_queries.observe(g.query_count, endpoint=endpoint, method=request.method)
+        metrics.request_db_time.observe(g.db_time, endpoint=endpoint, method=request.method)
+        response.headers["Server-Timing"] = (f'db;dur={g.db_time * 1000:.2f};desc="{g.query_count} queries", '
+                                             f'app;dur={elapsed * 1000:.2f}')
+        return response
+
+    @app.teardown_request
+    def finish_request(exception=None):
+        if g.pop("in_flight", False):
+            metrics.in_flight.dec()
+
+
+def setup_compression(app):
+    # brotli/gzip negotiated per request; static files are sent from precompressed copies,
+    # which are written at startup
+    if not Config.COMPRESS_RESPONSES:
+        return
+
+    from app.compression import compressor
+
+    def send_static_file(filename):
+        return compressor.send_static_file(app.static_folder, filename, app.get_send_file_max_age(filename))
+
+    app.view_functions["static"] = send_static_file
+    app.after_request(compressor.compress_response)
+
+
+def setup_startup(app):
+    # everything a new worker would otherwise do on its first requests: schema checks, revoked tokens,
+    # database connections and read caches; durations are logged and exported by /api/metrics
+    from datetime import date
+    from app.blocklist import revocation_cache
+    from app.choice_index import today_choices
+    from app.compression import compressor
+    from app.models import RestaurantModel, MenusModel, TableVersionModel, GRAPH_TABLES
+    from app.views.restaurants import LIST_EXPAND as RESTAURANTS_EXPAND
+    from app.views.menus import LIST_EXPAND as MENUS_EXPAND, DAYS
+
+    def prepare_schema():
+        if Config.STARTUP_CREATE_SCHEMA:
+            base.metadata.create_all(db)
+            upgrade(db)
+        elif pending(db):
+            raise RuntimeError(f"Database schema is not up to date, pending migrations: {pending(db)}. "
+                               f"Run 'flask db-upgrade' first.")
+
+    def open_connections():
+        connections = [db.connect() for _ in range(Config.STARTUP_POOL_CONNECTIONS)]
+        for connection in connections:
+            connection.close()
+
+    def precompress_static():
+        try:
+            compressor.precompress_static(app.static_folder)
+        except OSError as error:
+            app.logger.warning("Static files are not precompressed: %s", error)
+
+    def prime_caches():
+        # versions are seen first, so the entries are not dropped as older than them by the first request
+        TableVersionModel.find_versions(GRAPH_TABLES)
+        # the same calls with the same arguments as default list requests, so they hit these entries
+        RestaurantModel.return_all(0, Config.DEFAULT_PAGE_LIMIT, fields=None,
+                                   expand=tuple(sorted(RESTAURANTS_EXPAND)))
+        MenusModel.return_all(0, Config.DEFAULT_PAGE_LIMIT, fields=None, expand=tuple(sorted(MENUS_EXPAND)))
+        MenusModel.find_by_day(DAYS[date.today().weekday()], 0, Config.DEFAULT_PAGE_LIMIT)
+        today_choices.page(0, 1)
+
+    phases = [("schema", prepare_schema), ("blocklist", revocation_cache.seed)]
+    if Config.COMPRESS_RESPONSES:
+        phases.append(("static", precompress_static))
+    if Config.STARTUP_WARMUP:
+        phases += [("pool", open_connections), ("caches", prime_caches)]
+
+    timings = {}
+    try:
+        for name, phase in phases:
+            started = time.perf_counter()
+            phase()
+            timings[name] = time.perf_counter() - started
+    finally:
+        Session.remove()
+    app.extensions["startup_timings"] = timings
+    app.logger.info("Startup finished in %.1f ms (%s)", sum(timings.values()) * 1000,
+                    ", ".join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in timings.items()))
 
 
 def setup_swagger(app):
@@ -34,18 +187,28 @@ def setup_swagger(app):
 
 def create_app():
     app = Flask(__name__)
-    cors = CORS(app, resources={r"/api/*": {"origins": "*"}})
+    app.json = JSONProvider(app)
+    # paging headers and ETag are readable by browser clients of other origins
+    cors = CORS(app, resources={r"/api/*": {"origins": "*"}},
+                expose_headers=["X-Next-Cursor", "X-Total-Count", "ETag"])
     app.config.from_object(Config)
     app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
     setup_database(app)
     setup_jwt(app)
+    setup_hashing()
+    setup_rate_limits(app)
+    setup_metrics(app)
     setup_swagger(app)
 
-    from .views import restaurants_bp, choices_bp, employees_bp, menus_bp, auth_bp
+    from .views import restaurants_bp, choices_bp, employees_bp, menus_bp, auth_bp, cache_bp, metrics_bp
     app.register_blueprint(restaurants_bp)
     app.register_blueprint(choices_bp)
     app.register_blueprint(employees_bp)
     app.register_blueprint(menus_bp)
     app.register_blueprint(auth_bp)
+    app.register_blueprint(cache_bp)
+    app.register_blueprint(metrics_bp)
+    setup_compression(app)
+    setup_startup(app)
 
     return app
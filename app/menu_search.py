@@ -0,0 +1,118 @@
+import re
+
+from sqlalchemy import text, bindparam
+
+from app.database.database import db, session
+from app.cache import read_cache
+from app.bulk import chunks
+
+DAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+# restaurant name weighs more than dishes in ranking
+POSTGRES_DOCUMENT = "setweight(to_tsvector('simple', restaurant.name), 'A') || " \
+                    "setweight(to_tsvector('simple', menu.{day}), 'B')"
+SQLITE_RANK = "bm25(menu_search, 0, 0, 0, 2.0, 1.0)"
+
+
+class MenuSearch:
+    """
+    Full-text index of menus, one row per menu and day of week with restaurant name and dishes.
+    SQLite keeps it in FTS5 table, PostgreSQL in a table with GIN indexed tsvector column.
+    Rows are keyed by rowid = menu id * 7 + number of the day, the table is created by migrations.
+    """
+
+    @staticmethod
+    def rows_statement(dialect_name, where=""):
+        """
+        Build statement which inserts index rows of menus
+        :param dialect_name: name of database dialect
+        :param where: condition on menu and restaurant tables, all menus by default
+        :return: SQL string
+        """
+        columns = "rowid, menu_id, restaurant_id, day, restaurant, dishes"
+        if dialect_name == "postgresql":
+            columns += ", document"
+        selects = []
+        for number, day in enumerate(DAYS):
+            values = f"menu.id * 7 + {number}, menu.id, menu.restaurant_id, '{day}', restaurant.name, menu.{day}"
+            if dialect_name == "postgresql":
+                values += ", " + POSTGRES_DOCUMENT.format(day=day)
+            selects.append(f"SELECT {values} FROM menu JOIN restaurant ON restaurant.id = menu.restaurant_id "
+                           f"{where}")
+        return f"INSERT INTO menu_search ({columns}) " + " UNION ALL ".join(selects)
+
+    @classmethod
+    def reindex(cls, menu_ids):
+        """
+        Replace index rows of menus with their current dishes and restaurant name, without
+        committing the transaction, so index changes together with menus
+        :param menu_ids: iterable of menu ids
+        :return: None
+        """
+        menu_ids = list(menu_ids)
+        cls.remove(menu_ids)
+        statement = text(cls.rows_statement(db.dialect.name, "WHERE menu.id IN :ids")) \
+            .bindparams(bindparam("ids", expanding=True))
+        for chunk in chunks(menu_ids):
+            session.execute(statement, {"ids": chunk})
+
+    @staticmethod
+    def remove(menu_ids):
+        """
+        Delete index rows of menus, without committing the transaction
+        :param menu_ids: iterable of menu ids
+        :return: None
+        """
+        statement = text("DELETE FROM menu_search WHERE rowid IN :rowids") \
+            .bindparams(bindparam("rowids", expanding=True))
+        rowids = [id_ * 7 + number for id_ in menu_ids for number in range(len(DAYS))]
+        for chunk in chunks(rowids):
+            session.execute(statement, {"rowids": chunk})
+
+    @classmethod
+    def rebuild(cls, connection):
+        """
+        Rebuild the whole index from menus, e.g. after menus were inserted bypassing models
+        :param connection: database connection
+        :return: None
+        """
+        connection.execute(text("DELETE FROM menu_search"))
+        connection.execute(text(cls.rows_statement(connection.dialect.name)))
+
+    @staticmethod
+    def terms(query):
+        """
+        Split search query into terms
+        :param query: text typed by user
+        :return: tuple of lowercase words
+        """
+        return tuple(re.findall(r"\w+", query.lower()))
+
+    @classmethod
+    @read_cache.cached("menu", "restaurant")
+    def search(cls, terms, day=None, limit=20):
+        """
+        Find menus matching all terms, each term may be a prefix of a word in dishes or restaurant name
+        :param terms: tuple of words
+        :param day: day of week, None - all days
+        :param limit: maximal number of results
+        :return: list of dicts with menu, restaurant and dishes of the day, best matches first
+        """
+        if db.dialect.name == "postgresql":
+            query = " & ".join(f"{term}:*" for term in terms)
+            match = "document @@ to_tsquery('simple', :query)"
+            order = "ts_rank(document, to_tsquery('simple', :query)) DESC"
+        else:
+            query = " ".join(f'"{term}"*' for term in terms)
+            match = "menu_search MATCH :query"
+            order = SQLITE_RANK
+        if day is not None:
+            match += " AND day = :day"
+        rows = session.execute(text(f"SELECT menu_id, restaurant_id, restaurant, day, dishes FROM menu_search "
+                                    f"WHERE {match} ORDER BY {order}, rowid LIMIT :limit"),
+                               {"query": query, "day": day, "limit": limit})
+        return [
+            {"menu_id": menu_id, "restaurant_id": restaurant_id, "restaurant": restaurant, "day": day,
+             "dishes": dishes}
+            for menu_id, restaurant_id, restaurant, day, dishes in rows
+        ]
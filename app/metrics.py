@@ -0,0 +1,128 @@
+import bisect
+import threading
+
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500, 1000)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join('{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"'))
+                     for name, value in labels)
+    return "{" + pairs + "}"
+
+
+def _format_value(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """
+    Thread-safe Prometheus histogram with a fixed set of label names
+    """
+
+    def __init__(self, name, description, buckets, label_names=()):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(buckets)
+        self.label_names = tuple(label_names)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        """
+        Record one observation
+        :param value: observed value
+        :param labels: label values, one per label name
+        :return: None
+        """
+        key = tuple(labels.get(name, "") for name in self.label_names)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * len(self.buckets), 0, 0]
+            if index < len(self.buckets):
+                series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        """
+        Render histogram in Prometheus text format
+        :return: list of lines
+        """
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((key, (list(counts), total, count))
+                            for key, (counts, total, count) in self._series.items())
+        for key, (counts, total, count) in series:
+            labels = list(zip(self.label_names, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(labels + [('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(labels + [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+class Gauge:
+    """
+    Thread-safe Prometheus gauge without labels
+    """
+
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount=1):
+        with self._lock:
+            self.value -= amount
+
+    def render(self):
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} gauge", f"{self.name} {self.value}"]
+
+
+class Metrics:
+    """
+    Process-local request and database metrics exposed by /api/metrics
+    """
+
+    def __init__(self):
+        self.request_latency = Histogram("lunch_request_duration_seconds", "Request latency by endpoint.",
+                                         LATENCY_BUCKETS, ("endpoint", "method", "status"))
+        self.request_queries = Histogram("lunch_request_queries", "SQL statements executed per request by endpoint.",
+                                         QUERY_COUNT_BUCKETS, ("endpoint", "method"))
+        self.request_db_time = Histogram("lunch_request_db_seconds", "Time spent in SQL per request by endpoint.",
+                                         LATENCY_BUCKETS, ("endpoint", "method"))
+        self.pool_wait = Histogram("lunch_db_pool_checkout_seconds", "Time spent waiting for a pooled connection.",
+                                   POOL_WAIT_BUCKETS)
+        self.in_flight = Gauge("lunch_requests_in_flight", "Requests being served right now.")
+
+    def render(self, extra_gauges=None):
+        """
+        Render all metrics in Prometheus text format
+        :param extra_gauges: {name: (description, value)} of gauges computed at scrape time
+        :return: text
+        """
+        lines = []
+        for metric in (self.request_latency, self.request_queries, self.request_db_time, self.pool_wait,
+                       self.in_flight):
+            lines.extend(metric.render())
+        for name, (description, value) in sorted((extra_gauges or {}).items()):
+            lines.extend([f"# HELP {name} {description}", f"# TYPE {name} gauge", f"{name} {_format_value(value)}"])
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
@@ -1,32 +1,79 @@
-from datetime import date, datetime
+from collections import defaultdict
+from datetime import date, datetime, timedelta
 
-from sqlalchemy import Column, String, Integer, DateTime, Date, ForeignKey, Boolean
-from sqlalchemy.orm import relationship
-from passlib.hash import pbkdf2_sha256 as sha256
+from sqlalchemy import Column, String, Integer, Float, DateTime, Date, ForeignKey, Boolean, Index, func, inspect, \
+    select, insert, update, delete, case, text, true, false, event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import relationship, joinedload, selectinload
 
 from app.database.database import base, session
+from app.main import Config
+from app.cache import read_cache, table_versions, invalidate_tables
+from app.blocklist import revocation_cache
+from app.choice_index import today_choices
+from app.hashing import hashing_pool
+from app.bulk import chunks
+from app.fieldsets import select_fields, load_fields, nested
+from app.menu_search import MenuSearch
+from app.json_provider import JSONList
+
+
+# INSERT constructs with ON CONFLICT DO UPDATE of the supported databases
+UPSERT_INSERTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+
+# tables whose rows are embedded into restaurant and menu representations
+GRAPH_TABLES = ("restaurant", "menu", "choices", "employees")
+
+
+def graph_tables(expand):
+    """
+    Tables read for restaurant and menu representations with given relations expanded
+    :param expand: dotted relation paths
+    :return: tuple of table names
+    """
+    relations = {name for path in expand for name in path.split(".")}
+    tables = ("restaurant", "menu")
+    if "choices" in relations:
+        tables += ("choices",)
+    if "employee" in relations:
+        tables += ("employees",)
+    return tables
+
+
+def _expanded_tables(arguments):
+    return graph_tables(arguments["expand"])
 
 
 class RestaurantModel(base):
     __tablename__ = "restaurant"
     id = Column(Integer, primary_key=True)
-    name = Column(String(120), nullable=False)
+    name = Column(String(120), nullable=False, index=True)
     menus = relationship("MenusModel", uselist=False, backref='restaurant')
 
+    FIELDS = ("id", "name")
+    EXPANSIONS = ("menus", "menus.choices", "menus.choices.employee")
+
     @classmethod
-    def find_by_id(cls, id_, to_dict=True):
+    @read_cache.cached(tags_from=_expanded_tables)
+    def find_by_id(cls, id_, to_dict=True, fields=None, expand=EXPANSIONS):
         """
         Find restaurant by id
         :param id_: restaurant id
         :param to_dict: if True - returns dict representation of restaurant info, if False -
             returns model instance
+        :param fields: attributes of representation, None - all
+        :param expand: relations embedded into representation
         :return: dict representation of restaurant info or model instance
         """
-        restaurant = session.query(cls).filter_by(id=id_).first()
+        query = session.query(cls)
+        if to_dict:
+            query = query.options(*cls.eager_options(expand), *load_fields(cls, fields))
+        restaurant = query.filter_by(id=id_).first()
         if not restaurant:
             return {}
         if to_dict:
-            return cls.to_dict(restaurant)
+            return cls.to_dict(restaurant, fields, expand)
         else:
             return restaurant
 
@@ -48,16 +95,35 @@ class RestaurantModel(base):
             return restaurant
 
     @classmethod
-    def return_all(cls, offset, limit):
+    @read_cache.cached(tags_from=_expanded_tables)
+    def return_all(cls, after_id, limit, fields=None, expand=EXPANSIONS):
         """
         Return all restaurants
-        :param offset: skip offset rows before beginning to return rows
+        :param after_id: keyset cursor, only rows with id greater than after_id are returned
         :param limit: determines the number of rows returned by the query
+        :param fields: attributes of representations, None - all
+        :param expand: relations embedded into representations
         :return: list of dict representations of restaurants
         """
-        restaurants = session.query(cls).order_by(cls.id).offset(offset).limit(limit).all()
+        restaurants = session.query(cls).options(*cls.eager_options(expand), *load_fields(cls, fields)) \
+            .filter(cls.id > after_id).order_by(cls.id).limit(limit).all()
 
-        return [cls.to_dict(restaurant) for restaurant in restaurants]
+        return JSONList(cls.to_dict(restaurant, fields, expand) for restaurant in restaurants)
+
+    @classmethod
+    def iter_all(cls, after_id, limit=None, fields=None, expand=EXPANSIONS):
+        """
+        Lazily yield all restaurants, fetching rows from the database in batches
+        :param after_id: keyset cursor, only rows with id greater than after_id are returned
+        :param limit: determines the number of rows returned by the query, None - no limit
+        :param fields: attributes of representations, None - all
+        :param expand: relations embedded into representations
+        :return: generator of dict representations of restaurants
+        """
+        restaurants = session.query(cls).options(*cls.eager_options(expand), *load_fields(cls, fields)) \
+            .filter(cls.id > after_id).order_by(cls.id).limit(limit).yield_per(Config.STREAM_BATCH_SIZE)
+        for restaurant in restaurants:
+            yield cls.to_dict(restaurant, fields, expand)
 
     @classmethod
     def delete_by_id(cls, id_):
@@ -68,32 +134,84 @@ class RestaurantModel(base):
         """
         restaurant = session.query(cls).filter_by(id=id_).first()
         if restaurant:
+            if restaurant.menus:
+                MenuSearch.remove([restaurant.menus.id])
             session.delete(restaurant)
+            TableVersionModel.bump(cls.__tablename__)
             session.commit()
+            invalidate_tables(cls.__tablename__)
             return 200
         else:
             return 404
 
     def save_to_db(self):
         """
-        Save model instance to database
+        Save model instance to database, reindexing menu of renamed restaurant
         :return: None
         """
+        state = inspect(self)
+        renamed = state.has_identity and state.attrs.name.history.has_changes()
         session.add(self)
+        if renamed and self.menus:
+            session.flush()
+            MenuSearch.reindex([self.menus.id])
+        TableVersionModel.bump(self.__tablename__)
         session.commit()
+        invalidate_tables(self.__tablename__)
+
+    @classmethod
+    def find_existing_ids(cls, ids):
+        """
+        Find which of given restaurant ids exist
+        :param ids: iterable of restaurant ids
+        :return: set of existing ids
+        """
+        existing = set()
+        for chunk in chunks(ids):
+            existing.update(id_ for id_, in session.query(cls.id).filter(cls.id.in_(chunk)))
+        return existing
+
+    @classmethod
+    def bulk_insert(cls, mappings):
+        """
+        Insert many restaurants in one transaction
+        :param mappings: list of dicts with column values
+        :return: None
+        """
+        session.bulk_insert_mappings(cls, mappings)
+        TableVersionModel.bump(cls.__tablename__)
+        session.commit()
+        invalidate_tables(cls.__tablename__)
 
     @staticmethod
-    def to_dict(restaurant):
+    def eager_options(expand=EXPANSIONS):
+        """
+        Loader options which fetch expanded part of the restaurant graph (menu, its choices and
+        their employees) in a fixed number of queries
+        :param expand: relations embedded into representation
+        :return: tuple of loader options
+        """
+        if "menus" not in expand:
+            return ()
+        return (
+            joinedload(RestaurantModel.menus).options(*MenusModel.eager_options(nested(expand, "menus"),
+                                                                                with_restaurant=False)),
+        )
+
+    @staticmethod
+    def to_dict(restaurant, fields=None, expand=EXPANSIONS):
         """
         Represent model instance (restaurant) information
         :param restaurant: model instance
+        :param fields: attributes of representation, None - all
+        :param expand: relations embedded into representation
         :return: dict representation of restaurant info
         """
-        return {
-            "id": restaurant.id,
-            "name": restaurant.name,
-            "menus": MenusModel.find_by_restaurant_id(restaurant.id),
-        }
+        data = select_fields(restaurant, ("id", "name"), fields)
+        if "menus" in expand:
+            data["menus"] = MenusModel.to_dict(restaurant.menus, expand=nested(expand, "menus")) \
+                if restaurant.menus else {}
+        return data
 
 
 class MenusModel(base):
@@ -107,23 +225,33 @@ class MenusModel(base):
     friday = Column(String(500), nullable=False)
     saturday = Column(String(500), nullable=False)
     sunday = Column(String(500), nullable=False)
-    choices = relationship("ChoicesModel", lazy='dynamic', cascade="all, delete-orphan",
+    choices = relationship("ChoicesModel", cascade="all, delete-orphan", back_populates="menu",
                            foreign_keys="ChoicesModel.menu_id")
 
+    FIELDS = ("id", "restaurant_id", "restaurant",
+              "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+    EXPANSIONS = ("choices", "choices.employee")
+
     @classmethod
-    def find_by_id(cls, id_, to_dict=True):
+    @read_cache.cached(tags_from=_expanded_tables)
+    def find_by_id(cls, id_, to_dict=True, fields=None, expand=EXPANSIONS):
         """
         Find menu by id
         :param id_: menu id
         :param to_dict: if True - returns dict representation of menu info, if False -
             returns model instance
+        :param fields: attributes of representation, None - all
+        :param expand: relations embedded into representation
         :return: dict representation of menu info or model instance
         """
-        menu = session.query(cls).filter_by(id=id_).first()
+        query = session.query(cls)
+        if to_dict:
+            query = query.options(*cls.eager_options(expand), *load_fields(cls, fields))
+        menu = query.filter_by(id=id_).first()
         if not menu:
             return {}
         if to_dict:
-            return cls.to_dict(menu)
+            return cls.to_dict(menu, fields, expand)
         else:
             return menu
 
@@ -136,7 +264,10 @@ class MenusModel(base):
             returns model instance
         :return: dict representation of menu info or model instance
         """
-        menu = session.query(cls).filter_by(restaurant_id=restaurant_id).first()
+        query = session.query(cls)
+        if to_dict:
+            query = query.options(*cls.eager_options())
+        menu = query.filter_by(restaurant_id=restaurant_id).first()
         if not menu:
             return {}
         if to_dict:
@@ -144,34 +275,53 @@ class MenusModel(base):
         else:
             return menu
 
-    # #TODO
-    # @classmethod
-    # def find_by_day(cls, day, to_dict=True):
-    #     """
-    #     Find menu by day
-    #     :param day: day of restaurant's menu
-    #     :param to_dict: if True - returns dict representation of restaurant's menu info, if False -
-    #         returns model instance
-    #     :return: dict representation of restaurant's menu info or model instance
-    #     """
-    #     # menus = session.query(cls).filter_by(day=day).order_by(cls.id)
-    #     # if not menus:
-    #     #     return {}
-    #     # if to_dict:
-    #     #     return cls.to_dict(menus)
-    #     # else:
-    #     #     return menus
-
-    @classmethod
-    def return_all(cls, offset, limit):
+    @classmethod
+    @read_cache.cached("menu", "restaurant")
+    def find_by_day(cls, day, after_id, limit):
+        """
+        Find dishes of menus for one day of week, reading only that day's column
+        :param day: day of week, name of menu column ("monday" ... "sunday")
+        :param after_id: keyset cursor, only rows with id greater than after_id are returned
+        :param limit: determines the number of rows returned by the query
+        :return: list of dicts with menu id, restaurant id and name and dishes of the day
+        """
+        menus = session.query(cls.id, cls.restaurant_id, RestaurantModel.name, getattr(cls, day)) \
+            .outerjoin(RestaurantModel, RestaurantModel.id == cls.restaurant_id) \
+            .filter(cls.id > after_id).order_by(cls.id).limit(limit).all()
+        return JSONList(
+            {"id": id_, "restaurant_id": restaurant_id, "restaurant": restaurant, day: dishes}
+            for id_, restaurant_id, restaurant, dishes in menus
+        )
+
+    @classmethod
+    @read_cache.cached(tags_from=_expanded_tables)
+    def return_all(cls, after_id, limit, fields=None, expand=EXPANSIONS):
         """
         Return all menus
-        :param offset: skip offset rows before beginning to return rows
+        :param after_id: keyset cursor, only rows with id greater than after_id are returned
         :param limit: determines the number of rows returned by the query
+        :param fields: attributes of representations, None - all
+        :param expand: relations embedded into representations
         :return: list of dict representations of menus
         """
-        menus = session.query(cls).order_by(cls.id).offset(offset).limit(limit).all()
-        return [cls.to_dict(menu) for menu in menus]
+        menus = session.query(cls).options(*cls.eager_options(expand), *load_fields(cls, fields)) \
+            .filter(cls.id > after_id).order_by(cls.id).limit(limit).all()
+        return JSONList(cls.to_dict(menu, fields, expand) for menu in menus)
+
+    @classmethod
+    def iter_all(cls, after_id, limit=None, fields=None, expand=EXPANSIONS):
+        """
+        Lazily yield all menus, fetching rows from the database in batches
+        :param after_id: keyset cursor, only rows with id greater than after_id are returned
+        :param limit: determines the number of rows returned by the query, None - no limit
+        :param fields: attributes of representations, None - all
+        :param expand: relations embedded into representations
+        :return: generator of dict representations of menus
+        """
+        menus = session.query(cls).options(*cls.eager_options(expand), *load_fields(cls, fields)) \
+            .filter(cls.id > after_id).order_by(cls.id).limit(limit).yield_per(Config.STREAM_BATCH_SIZE)
+        for menu in menus:
+            yield cls.to_dict(menu, fields, expand)
 
     @classmethod
     def delete_by_id(cls, id_):
@@ -182,138 +332,245 @@ class MenusModel(base):
         """
         menu = session.query(cls).filter_by(id=id_).first()
         if menu:
+            ChoiceTallyModel.forget_menu(menu.id)
+            MenuSearch.remove([menu.id])
             session.delete(menu)
+            TableVersionModel.bump(cls.__tablename__)
             session.commit()
+            invalidate_tables(cls.__tablename__)
+            # menu's choices are deleted by cascade
+            today_choices.invalidate()
             return 200
         else:
             return 404
 
     def save_to_db(self):
         """
-        Save model instance to database
+        Save model instance to database together with its rows of the full-text index
         :return: None
         """
         session.add(self)
+        session.flush()
+        MenuSearch.reindex([self.id])
+        TableVersionModel.bump(self.__tablename__)
+        session.commit()
+        invalidate_tables(self.__tablename__)
+
+    @classmethod
+    def find_restaurant_ids_with_menu(cls, restaurant_ids):
+        """
+        Find which of given restaurants already have a menu
+        :param restaurant_ids: iterable of restaurant ids
+        :return: set of restaurant ids
+        """
+        existing = set()
+        for chunk in chunks(restaurant_ids):
+            existing.update(id_ for id_, in session.query(cls.restaurant_id).filter(cls.restaurant_id.in_(chunk)))
+        return existing
+
+    @classmethod
+    def bulk_insert(cls, mappings):
+        """
+        Insert many menus in one transaction
+        :param mappings: list of dicts with column values
+        :return: None
+        """
+        session.bulk_insert_mappings(cls, mappings)
+        menu_ids = []
+        for chunk in chunks([mapping["restaurant_id"] for mapping in mappings]):
+            menu_ids.extend(id_ for id_, in session.query(cls.id).filter(cls.restaurant_id.in_(chunk)))
+        MenuSearch.reindex(menu_ids)
+        TableVersionModel.bump(cls.__tablename__)
         session.commit()
+        invalidate_tables(cls.__tablename__)
+
+    @staticmethod
+    def eager_options(expand=EXPANSIONS, with_restaurant=True):
+        """
+        Loader options which fetch menu's restaurant and expanded choices and their employees
+        in a fixed number of queries
+        :param expand: relations embedded into representation
+        :param with_restaurant: if False - restaurant is not loaded, e.g. when menu is loaded from it
+        :return: tuple of loader options
+        """
+        options = [joinedload(MenusModel.restaurant)] if with_restaurant else []
+        if "choices" in expand:
+            choices = selectinload(MenusModel.choices)
+            if "choices.employee" in expand:
+                choices = choices.joinedload(ChoicesModel.employee)
+            options.append(choices)
+        return tuple(options)
 
     @staticmethod
-    def to_dict(menu):
+    def to_dict(menu, fields=None, expand=EXPANSIONS):
         """
         Represent model instance (menu) information
         :param menu: model instance
+        :param fields: attributes of representation, None - all
+        :param expand: relations embedded into representation
         :return: dict representation of menus info
         """
-        restaurant = RestaurantModel.find_by_id(menu.restaurant_id, to_dict=False)
-        return {
-            "id": menu.id,
-            "restaurant_id": menu.restaurant_id,
-            "restaurant": restaurant.name,
-            "monday": menu.monday,
-            "tuesday": menu.tuesday,
-            "wednesday": menu.wednesday,
-            "thursday": menu.thursday,
-            "friday": menu.friday,
-            "saturday": menu.saturday,
-            "sunday": menu.sunday,
-            "choices": [ChoicesModel.find_by_id(choice.id) for choice in menu.choices]
-        }
+        data = select_fields(menu, ("id", "restaurant_id", "monday", "tuesday", "wednesday", "thursday", "friday",
+                                    "saturday", "sunday"), fields)
+        if fields is None or "restaurant" in fields:
+            data["restaurant"] = menu.restaurant.name if menu.restaurant else None
+        if "choices" in expand:
+            choice_expand = nested(expand, "choices")
+            data["choices"] = [ChoicesModel.to_dict(choice, expand=choice_expand) for choice in menu.choices]
+        return data
 
 
 class EmployeeModel(base):
     __tablename__ = "employees"
+    __table_args__ = (
+        Index("ix_employees_name", "firstname", "lastname"),
+        # keep listing cost proportional to the page, not to the number of former employees
+        Index("ix_employees_active", "id", sqlite_where=text("is_active = 1"),
+              postgresql_where=text("is_active = true")),
+        Index("ix_employees_inactive", "id", sqlite_where=text("is_active = 0"),
+              postgresql_where=text("is_active = false")),
+    )
     id = Column(Integer, primary_key=True)
     firstname = Column(String(30), nullable=False)
     lastname = Column(String(30), nullable=False)
-    email = Column(String(50), nullable=False)
+    email = Column(String(50), nullable=False, index=True)
     hashed_password = Column(String(100), nullable=False)
     is_active = Column(Boolean(), nullable=False)
     is_admin = Column(Boolean(), default=False)
-    choices = relationship("ChoicesModel", lazy='dynamic', cascade="all, delete-orphan",
+    choices = relationship("ChoicesModel", lazy='dynamic', cascade="all, delete-orphan", back_populates="employee",
                            foreign_keys="ChoicesModel.employee_id")
 
+    FIELDS = ("id", "firstname", "lastname", "email", "is_active", "is_admin")
+    EXPANSIONS = ("choices", "choices.employee")
+
     @classmethod
-    def find_by_id(cls, id_, to_dict=True, without_choices=False):
+    def find_by_id(cls, id_, to_dict=True, fields=None, expand=EXPANSIONS):
         """
         Find active employee by id
         :param id_: employee id
         :param to_dict: if True - returns dict representation of employee info, if False -
             returns model instance
+        :param fields: attributes of representation, None - all
+        :param expand: relations embedded into representation
         :return: dict representation of employee info or model instance
         """
-        employee = session.query(cls).filter_by(id=id_).first()
+        query = session.query(cls)
+        if to_dict:
+            query = query.options(*load_fields(cls, fields))
+        employee = query.filter(cls.id == id_, cls._active_clause()).first()
         if not employee:
             return {}
-        if employee.is_active:
-            if to_dict:
-                return cls.to_dict(employee, without_choices=without_choices)
-            else:
-                return employee
+        if to_dict:
+            return cls.to_dict(employee, fields, expand)
         else:
-            return {}
+            return employee
 
     @classmethod
-    def find_by_name(cls, firstname, lastname, to_dict=True):
+    def find_by_name(cls, firstname, lastname, to_dict=True, fields=None, expand=EXPANSIONS):
         """
         Find active employee by name
         :param firstname: employee firstname
         :param lastname: employee lastname
         :param to_dict: if True - returns dict representation of employee info, if False -
             returns model instance
+        :param fields: attributes of representation, None - all
+        :param expand: relations embedded into representation
         :return: dict representation of employee info or model instance
         """
-        employee = session.query(cls).filter_by(firstname=firstname, lastname=lastname) \
+        employee = session.query(cls) \
+            .filter(cls.firstname == firstname, cls.lastname == lastname, cls._active_clause()) \
             .order_by(cls.id).first()
         if not employee:
             return {}
-        if employee.is_active:
-            if to_dict:
-                return cls.to_dict(employee)
-            else:
-                return employee
+        if to_dict:
+            return cls.to_dict(employee, fields, expand)
         else:
-            return {}
+            return employee
 
     @classmethod
-    def find_by_email(cls, email, to_dict=True):
+    def find_by_email(cls, email, to_dict=True, fields=None, expand=EXPANSIONS):
         """
         Find active employee by email
         :param email: employee email
         :param to_dict: if True - returns dict representation of employee info, if False -
             returns model instance
+        :param fields: attributes of representation, None - all
+        :param expand: relations embedded into representation
         :return: dict representation of employee info or model instance
         """
-        employee = session.query(cls).filter_by(email=email).first()
+        employee = session.query(cls).filter(cls.email == email, cls._active_clause()).first()
         if not employee:
             return {}
-        if employee.is_active:
-            if to_dict:
-                return cls.to_dict(employee)
-            else:
-                return employee
+        if to_dict:
+            return cls.to_dict(employee, fields, expand)
         else:
-            return {}
+            return employee
 
     @classmethod
-    def return_all(cls, offset, limit):
+    def return_all(cls, after_id, limit, fields=None, expand=EXPANSIONS):
         """
         Return all active employees
-        :param offset: skip offset rows before beginning to return rows
+        :param after_id: keyset cursor, only rows with id greater than after_id are returned
         :param limit: determines the number of rows returned by the query
+        :param fields: attributes of representations, None - all
+        :param expand: relations embedded into representations
         :return: list of dict representations of employees
         """
-        employees = session.query(cls).order_by(cls.id).offset(offset).limit(limit).all()
-        return [cls.to_dict(employee) for employee in employees if employee.is_active]
+        employees = session.query(cls).options(*load_fields(cls, fields)) \
+            .filter(cls.id > after_id, cls._active_clause()) \
+            .order_by(cls.id).limit(limit).all()
+        return [cls.to_dict(employee, fields, expand) for employee in employees]
 
     @classmethod
-    def return_all_inactive(cls, offset, limit):
+    def return_all_inactive(cls, after_id, limit, fields=None, expand=EXPANSIONS):
         """
         Return all inactive employees
-        :param offset: skip offset rows before beginning to return rows
+        :param after_id: keyset cursor, only rows with id greater than after_id are returned
         :param limit: determines the number of rows returned by the query
+        :param fields: attributes of representations, None - all
+        :param expand: relations embedded into representations
         :return: list of dict representations of employees
         """
-        employees = session.query(cls).order_by(cls.id).offset(offset).limit(limit).all()
-        return [cls.to_dict(employee) for employee in employees if not employee.is_active]
+        employees = session.query(cls).options(*load_fields(cls, fields)) \
+            .filter(cls.id > after_id, cls._active_clause(False)) \
+            .order_by(cls.id).limit(limit).all()
+        return [cls.to_dict(employee, fields, expand) for employee in employees]
+
+    @classmethod
+    def iter_all(cls, after_id, limit=None, is_active=True, fields=None, expand=EXPANSIONS):
+        """
+        Lazily yield all active (or inactive) employees, fetching rows from the database in batches
+        :param after_id: keyset cursor, only rows with id greater than after_id are returned
+        :param limit: determines the number of rows returned by the query, None - no limit
+        :param is_active: if True - yields active employees, if False - inactive ones
+        :param fields: attributes of representations, None - all
+        :param expand: relations embedded into representations
+        :return: generator of dict representations of employees
+        """
+        employees = session.query(cls).options(*load_fields(cls, fields)) \
+            .filter(cls.id > after_id, cls._active_clause(is_active)) \
+            .order_by(cls.id).limit(limit).yield_per(Config.STREAM_BATCH_SIZE)
+        for employee in employees:
+            yield cls.to_dict(employee, fields, expand)
+
+    @classmethod
+    def _active_clause(cls, is_active=True):
+        """
+        Condition on is_active with a literal value, so it matches predicates of partial indexes
+        :param is_active: if True - condition matches active employees, if False - inactive ones
+        :return: SQL expression
+        """
+        return cls.is_active == (true() if is_active else false())
+
+    @classmethod
+    @read_cache.cached("employees")
+    def count_all(cls, is_active=True):
+        """
+        Count active (or inactive) employees
+        :param is_active: if True - counts active employees, if False - inactive ones
+        :return: number of employees
+        """
+        return session.query(func.count(cls.id)).filter(cls._active_clause(is_active)).scalar()
 
     @classmethod
     def delete_by_id(cls, id_):
@@ -336,76 +593,125 @@ class EmployeeModel(base):
         :return: None
         """
         session.add(self)
+        TableVersionModel.bump(self.__tablename__)
+        session.commit()
+        invalidate_tables(self.__tablename__)
+
+    @classmethod
+    def find_active_emails(cls, emails):
+        """
+        Find which of given emails are used by active employees
+        :param emails: iterable of emails
+        :return: set of used emails
+        """
+        existing = set()
+        for chunk in chunks(emails):
+            existing.update(email for email, in session.query(cls.email)
+                            .filter(cls.email.in_(chunk), cls._active_clause()))
+        return existing
+
+    @classmethod
+    def bulk_insert(cls, mappings):
+        """
+        Insert many employees in one transaction
+        :param mappings: list of dicts with column values
+        :return: None
+        """
+        session.bulk_insert_mappings(cls, mappings)
+        TableVersionModel.bump(cls.__tablename__)
         session.commit()
+        invalidate_tables(cls.__tablename__)
 
     @staticmethod
-    def to_dict(employee, without_choices=False):
+    def to_dict(employee, fields=None, expand=EXPANSIONS):
         """
         Represent model instance (employee) information
         :param employee: model instance
+        :param fields: attributes of representation, None - all
+        :param expand: relations embedded into representation
         :return: dict representation of employee info
         """
-        if without_choices:
-            return {
-                "id": employee.id,
-                "firstname": employee.firstname,
-                "lastname": employee.lastname,
-                "email": employee.email,
-                "is_active": employee.is_active,
-                "is_admin": employee.is_admin,
-            }
-        else:
-            return {
-                "id": employee.id,
-                "firstname": employee.firstname,
-                "lastname": employee.lastname,
-                "email": employee.email,
-                "is_active": employee.is_active,
-                "is_admin": employee.is_admin,
-                "choices": [ChoicesModel.to_dict(choice) for choice in employee.choices],
-            }
+        data = select_fields(employee, ("id", "firstname", "lastname", "email", "is_active", "is_admin"), fields)
+        if "choices" in expand:
+            since = date.today() - timedelta(days=Config.EMPLOYEE_RECENT_CHOICES_DAYS)
+            data["choices"] = ChoicesModel.find_by_employee(employee.id, date_from=since,
+                                                            expand=nested(expand, "choices"))
+        return data
 
     @staticmethod
     def generate_hash(password):
         """
-        Generate hashed password
+        Generate hashed password in the hashing process pool
         :param password: password to hash
         :return: hashed password
         """
-        return sha256.hash(password)
+        return hashing_pool.hash(password)
 
     @staticmethod
     def verify_hash(password, hashed):
         """
-        Verify hashed password with imputed one
+        Verify hashed password with imputed one in the hashing process pool
         :param password: imputed password
         :param hashed: hashed password
         :return: True or False
         """
-        return sha256.verify(password, hashed)
+        return hashing_pool.verify(password, hashed)
+
+    @staticmethod
+    def generate_hashes(passwords):
+        """
+        Generate hashed passwords in parallel in the hashing process pool
+        :param passwords: list of passwords to hash
+        :return: list of hashed passwords in the same order
+        """
+        return hashing_pool.hash_many(passwords)
+
+    @staticmethod
+    def needs_rehash(hashed):
+        """
+        Check if password was hashed with other rounds than configured in Config.PBKDF2_ROUNDS
+        :param hashed: hashed password
+        :return: True or False
+        """
+        return hashing_pool.needs_rehash(hashed)
 
 
 class ChoicesModel(base):
     __tablename__ = "choices"
+    __table_args__ = (
+        # one choice per employee and day, also when it's made through several workers at once
+        Index("uq_choices_employee_id_current_day", "employee_id", "current_day", unique=True),
+        Index("ix_choices_current_day", "current_day", "id"),
+    )
     id = Column(Integer, primary_key=True)
     current_day = Column(Date())
     employee_id = Column(Integer, ForeignKey('employees.id'))
-    menu_id = Column(Integer, ForeignKey('menu.id'))
+    menu_id = Column(Integer, ForeignKey('menu.id'), index=True)
+    menu = relationship("MenusModel", back_populates="choices", foreign_keys=[menu_id])
+    employee = relationship("EmployeeModel", back_populates="choices", foreign_keys=[employee_id])
+
+    FIELDS = ("id", "current_day", "restaurant")
+    EXPANSIONS = ("employee",)
 
     @classmethod
-    def find_by_id(cls, id_, to_dict=True):
+    def find_by_id(cls, id_, to_dict=True, fields=None, expand=EXPANSIONS):
         """
         Find choice by id
         :param id_: choice id
         :param to_dict: if True - returns dict representation of choice info, if False -
             returns model instance
+        :param fields: attributes of representation, None - all
+        :param expand: relations embedded into representation
         :return: dict representation of choice info or model instance
         """
-        choice = session.query(cls).filter_by(id=id_).first()
+        query = session.query(cls)
+        if to_dict:
+            query = query.options(*cls.eager_options(expand), *load_fields(cls, fields))
+        choice = query.filter_by(id=id_).first()
         if not choice:
             return {}
         if to_dict:
-            return cls.to_dict(choice)
+            return cls.to_dict(choice, fields, expand)
         else:
             return choice
 
@@ -418,7 +724,7 @@ class ChoicesModel(base):
             returns model instance
         :return: dict representation of choice info or model instance
         """
-        choice = session.query(cls).filter_by(employee_id=id_, current_day=date.today().strftime("%Y-%m-%d")).first()
+        choice = session.query(cls).filter_by(employee_id=id_, current_day=date.today()).first()
         if not choice:
             return {}
         if to_dict:
@@ -427,16 +733,108 @@ class ChoicesModel(base):
             return choice
 
     @classmethod
-    def find_by_current_day(cls, offset, limit):
+    def find_by_employee(cls, employee_id, after_id=0, limit=None, date_from=None, date_to=None,
+                         fields=None, expand=EXPANSIONS):
+        """
+        Find choices of employee, optionally within a range of days
+        :param employee_id: employee id
+        :param after_id: keyset cursor, only rows with id greater than after_id are returned
+        :param limit: determines the number of rows returned by the query, None - no limit
+        :param date_from: first day of the range, None - unbounded
+        :param date_to: last day of the range, None - unbounded
+        :param fields: attributes of representations, None - all
+        :param expand: relations embedded into representations
+        :return: list of dict representations of choices
+        """
+        query = session.query(cls).options(*cls.eager_options(expand), *load_fields(cls, fields)) \
+            .filter(cls.employee_id == employee_id, cls.id > after_id)
+        if date_from is not None:
+            query = query.filter(cls.current_day >= date_from)
+        if date_to is not None:
+            query = query.filter(cls.current_day <= date_to)
+        choices = query.order_by(cls.id).limit(limit).all()
+        return [cls.to_dict(choice, fields, expand) for choice in choices]
+
+    @classmethod
+    def create_for_day(cls, day, selections):
+        """
+        Create choices of many employees for the day in one transaction, the first selection
+        of an employee who hasn't chosen yet wins
+        :param day: date of choices
+        :param selections: list of (employee_id, menu_id)
+        :return: list of new choice ids in order of selections, None for employees who have already chosen
+        """
+        chosen = set()
+        for chunk in chunks({employee_id for employee_id, _ in selections}):
+            chosen.update(employee_id for employee_id, in session.query(cls.employee_id)
+                          .filter(cls.current_day == day, cls.employee_id.in_(chunk)))
+        choices = []
+        menu_counts = defaultdict(int)
+        for employee_id, menu_id in selections:
+            if employee_id in chosen:
+                choices.append(None)
+                continue
+            chosen.add(employee_id)
+            menu_counts[menu_id] += 1
+            choices.append(cls(current_day=day, employee_id=employee_id, menu_id=menu_id))
+        if not menu_counts:
+            return choices
+
+        session.add_all([choice for choice in choices if choice is not None])
+        for menu_id, count in menu_counts.items():
+            ChoiceTallyModel.adjust(day, menu_id, count)
+        TableVersionModel.bump(cls.__tablename__)
+        session.flush()
+        ids = [choice.id if choice is not None else None for choice in choices]
+        session.commit()
+        invalidate_tables(cls.__tablename__)
+        version = TableVersionModel.committed(cls.__tablename__)
+        for id_, (employee_id, menu_id) in zip(ids, selections):
+            if id_ is not None:
+                today_choices.track(id_, employee_id, menu_id, day, version)
+        return ids
+
+    @classmethod
+    def find_by_current_day(cls, after_id, limit, fields=None, expand=EXPANSIONS):
         """
-        Find choices by current day
-        :param offset: skip offset rows before beginning to return rows
+        Find choices by current day, their ids are taken from the index of today's choices
+        :param after_id: keyset cursor, only rows with id greater than after_id are returned
         :param limit:  determines the number of rows returned by the query
+        :param fields: attributes of representations, None - all
+        :param expand: relations embedded into representations
         :return: list of dict representations of choices
         """
-        choices = session.query(cls).filter_by(current_day=date.today().strftime("%Y-%m-%d")) \
-            .order_by(cls.id).offset(offset).limit(limit).all()
-        return [cls.to_dict(choice) for choice in choices]
+        ids = today_choices.page(after_id, limit)
+        if not ids:
+            return []
+        choices = session.query(cls).options(*cls.eager_options(expand), *load_fields(cls, fields)) \
+            .filter(cls.id.in_(ids)).order_by(cls.id).all()
+        return [cls.to_dict(choice, fields, expand) for choice in choices]
+
+    @classmethod
+    def find_day_index(cls, day):
+        """
+        Find ids of choices of the day
+        :param day: date of choices
+        :return: list of tuples (id, employee_id, menu_id)
+        """
+        return session.query(cls.id, cls.employee_id, cls.menu_id).filter(cls.current_day == day).all()
+
+    @classmethod
+    def iter_current_day(cls, after_id, limit=None, fields=None, expand=EXPANSIONS):
+        """
+        Lazily yield current day choices, fetching rows from the database in batches
+        :param after_id: keyset cursor, only rows with id greater than after_id are returned
+        :param limit: determines the number of rows returned by the query, None - no limit
+        :param fields: attributes of representations, None - all
+        :param expand: relations embedded into representations
+        :return: generator of dict representations of choices
+        """
+        choices = session.query(cls).options(*cls.eager_options(expand), *load_fields(cls, fields)) \
+            .filter(cls.current_day == date.today(), cls.id > after_id) \
+            .order_by(cls.id).limit(limit).yield_per(Config.STREAM_BATCH_SIZE)
+        for choice in choices:
+            yield cls.to_dict(choice, fields, expand)
 
     @classmethod
     def delete_by_id(cls, id_):
@@ -447,50 +845,252 @@ class ChoicesModel(base):
         """
         choice = session.query(cls).filter_by(id=id_).first()
         if choice:
+            ChoiceTallyModel.adjust(choice.current_day, choice.menu_id, -1)
             session.delete(choice)
+            TableVersionModel.bump(cls.__tablename__)
             session.commit()
+            invalidate_tables(cls.__tablename__)
+            today_choices.discard(id_, TableVersionModel.committed(cls.__tablename__))
             return 200
         else:
             return 404
 
     def save_to_db(self):
         """
-        Save model instance to database
+        Save model instance to database, updating daily tally in the same transaction.
+        Raises IntegrityError when the employee already has a choice for the day.
         :return: None
         """
+        ChoiceTallyModel.track(self)
         session.add(self)
-        session.commit()
+        TableVersionModel.bump(self.__tablename__)
+        try:
+            session.commit()
+        except IntegrityError:
+            session.rollback()
+            raise
+        invalidate_tables(self.__tablename__)
+        today_choices.track(self.id, self.employee_id, self.menu_id, self.current_day,
+                            TableVersionModel.committed(self.__tablename__))
 
     @staticmethod
-    def to_dict(choice):
+    def eager_options(expand=EXPANSIONS):
+        """
+        Loader options which fetch choice's menu, restaurant and expanded employee in a single query
+        :param expand: relations embedded into representation
+        :return: tuple of loader options
+        """
+        options = [joinedload(ChoicesModel.menu).joinedload(MenusModel.restaurant)]
+        if "employee" in expand:
+            options.append(joinedload(ChoicesModel.employee))
+        return tuple(options)
+
+    @staticmethod
+    def to_dict(choice, fields=None, expand=EXPANSIONS):
         """
         Represent model instance (choice) information
         :param choice: model instance
+        :param fields: attributes of representation, None - all
+        :param expand: relations embedded into representation
         :return: dict representation of choice info
         """
-        restaurant = MenusModel.find_by_id(choice.menu_id, to_dict=False)
-        restaurant = RestaurantModel.find_by_id(restaurant.restaurant_id, to_dict=False)
-        return {
-            "id": choice.id,
-            "current_day": choice.current_day,
-            "employee": EmployeeModel.find_by_id(choice.employee_id, without_choices=True),
-            "restaurant": restaurant.name,
-        }
+        data = select_fields(choice, ("id", "current_day"), fields)
+        if "employee" in expand:
+            employee = choice.employee
+            data["employee"] = EmployeeModel.to_dict(employee, expand=()) if employee and employee.is_active else {}
+        if fields is None or "restaurant" in fields:
+            data["restaurant"] = choice.menu.restaurant.name
+        return data
+
+
+class ChoiceTallyModel(base):
+    __tablename__ = "choice_tally"
+    current_day = Column(Date(), primary_key=True)
+    menu_id = Column(Integer, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+    @classmethod
+    def adjust(cls, day, menu_id, delta):
+        """
+        Change number of choices of menu for the day, without committing the transaction.
+        A missing row is created by an upsert, so concurrent first choices of the same menu
+        in a day add up instead of conflicting.
+        :param day: date of choices
+        :param menu_id: menu id
+        :param delta: change of the number of choices
+        :return: None
+        """
+        if menu_id is None or day is None:
+            return
+        if delta <= 0:
+            session.query(cls).filter_by(current_day=day, menu_id=menu_id) \
+                .update({cls.count: cls.count + delta}, synchronize_session=False)
+            return
+        statement = UPSERT_INSERTS[session.get_bind().dialect.name](cls) \
+            .values(current_day=day, menu_id=menu_id, count=delta)
+        session.execute(statement.on_conflict_do_update(index_elements=[cls.current_day, cls.menu_id],
+                                                        set_={cls.count: cls.count + delta}))
+
+    @classmethod
+    def track(cls, choice):
+        """
+        Update tally for a new or changed choice before it's saved
+        :param choice: choice model instance
+        :return: None
+        """
+        state = inspect(choice)
+        if not state.has_identity:
+            cls.adjust(choice.current_day, choice.menu_id, 1)
+            return
+        old_day = cls._old_value(state, "current_day")
+        old_menu_id = cls._old_value(state, "menu_id")
+        if (old_day, old_menu_id) != (choice.current_day, choice.menu_id):
+            cls.adjust(old_day, old_menu_id, -1)
+            cls.adjust(choice.current_day, choice.menu_id, 1)
+
+    @staticmethod
+    def _old_value(state, attribute):
+        history = state.attrs[attribute].history
+        if history.deleted:
+            return history.deleted[0]
+        return history.unchanged[0] if history.unchanged else None
+
+    @classmethod
+    def forget_menu(cls, menu_id):
+        """
+        Delete tally of menu, without committing the transaction
+        :param menu_id: menu id
+        :return: None
+        """
+        session.query(cls).filter_by(menu_id=menu_id).delete(synchronize_session=False)
+
+    @classmethod
+    def summary(cls, day):
+        """
+        Return number of choices per restaurant for the day
+        :param day: date of choices
+        :return: list of dicts with restaurant info and number of choices
+        """
+        rows = session.query(RestaurantModel.id, RestaurantModel.name, MenusModel.id, cls.count) \
+            .join(MenusModel, MenusModel.id == cls.menu_id) \
+            .join(RestaurantModel, RestaurantModel.id == MenusModel.restaurant_id) \
+            .filter(cls.current_day == day, cls.count > 0) \
+            .order_by(cls.count.desc(), RestaurantModel.id).all()
+        return [
+            {"restaurant_id": restaurant_id, "restaurant": name, "menu_id": menu_id, "count": count}
+            for restaurant_id, name, menu_id, count in rows
+        ]
+
+    @classmethod
+    def rebuild(cls, day):
+        """
+        Recount tally of the day from choices table
+        :param day: date of choices
+        :return: None
+        """
+        session.query(cls).filter_by(current_day=day).delete(synchronize_session=False)
+        counts = session.query(ChoicesModel.menu_id, func.count(ChoicesModel.id)) \
+            .filter(ChoicesModel.current_day == day, ChoicesModel.menu_id.isnot(None)) \
+            .group_by(ChoicesModel.menu_id).all()
+        session.add_all([cls(current_day=day, menu_id=menu_id, count=count) for menu_id, count in counts])
+        session.commit()
+
+
+class TableVersionModel(base):
+    __tablename__ = "table_versions"
+    table_name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    updated_on = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    @classmethod
+    def bump(cls, table_name):
+        """
+        Mark table as changed by the current transaction. Its version is increased once per
+        transaction right before the commit (see increase_versions), so the new version becomes
+        visible together with the change, and the version row, which every write to the table
+        updates, stays locked only while the transaction commits.
+        :param table_name: name of the changed table
+        :return: None
+        """
+        session.info.setdefault("changed_tables", set()).add(table_name)
+
+    @classmethod
+    def increase(cls, session_, table_names):
+        """
+        Increase versions of tables in the transaction of session_
+        :param session_: session
+        :param table_names: names of changed tables
+        :return: dict {table name: new version}
+        """
+        now = datetime.utcnow()
+        versions = {}
+        # rows are locked in the same order by all transactions, so they can't deadlock on them
+        for table_name in sorted(table_names):
+            updated = session_.query(cls).filter_by(table_name=table_name) \
+                .update({cls.version: cls.version + 1, cls.updated_on: now}, synchronize_session=False)
+            if updated:
+                versions[table_name] = session_.query(cls.version).filter_by(table_name=table_name).scalar()
+            else:
+                session_.add(cls(table_name=table_name, version=1, updated_on=now))
+                versions[table_name] = 1
+        return versions
+
+    @staticmethod
+    def committed(table_name):
+        """
+        Find version of table made by the last commit of the current session
+        :param table_name: name of table
+        :return: version or None if the commit didn't change the table
+        """
+        return session.info.get("committed_versions", {}).get(table_name)
+
+    @classmethod
+    def find_versions(cls, table_names):
+        """
+        Find versions of tables, looked up at most once per TABLE_VERSIONS_TTL seconds
+        :param table_names: names of tables
+        :return: tuple of versions in order of table_names (0 for never changed tables) and
+            time of the latest change or None
+        """
+        rows = table_versions.get(table_names)
+        if rows is None:
+            query = session.query(cls.table_name, cls.version, cls.updated_on) \
+                .filter(cls.table_name.in_(table_names))
+            found = {name: (version, updated_on) for name, version, updated_on in query}
+            rows = table_versions.update({name: found.get(name, (0, None)) for name in table_names})
+        versions = tuple(rows[name][0] for name in table_names)
+        changes = [updated_on for _, updated_on in rows.values() if updated_on is not None]
+        return versions, max(changes) if changes else None
+
+
+@event.listens_for(session, "before_commit")
+def increase_versions(session_):
+    changed = session_.info.pop("changed_tables", None)
+    session_.info["committed_versions"] = TableVersionModel.increase(session_, changed) if changed else {}
+
+
+@event.listens_for(session, "after_transaction_end")
+def forget_changed_tables(session_, transaction):
+    # tables marked by a transaction which was rolled back or closed
+    if transaction.parent is None:
+        session_.info.pop("changed_tables", None)
 
 
 class RevokedTokenModel(base):
     __tablename__ = 'revoked_tokens'
     id_ = Column(Integer, primary_key=True)
-    jti = Column(String(120))
+    jti = Column(String(120), index=True)
     blacklisted_on = Column(DateTime, default=datetime.utcnow)
 
-    def add(self):
+    def add(self, expires=None):
         """
-        Save model instance to database
+        Save model instance to database and remember it in the revocation cache
+        :param expires: expiration timestamp of the revoked token ("exp" claim)
         :return: None
         """
         session.add(self)
         session.commit()
+        revocation_cache.add(self.jti, expires)
 
     @classmethod
     def is_jti_blacklisted(cls, jti):
@@ -501,3 +1101,69 @@ class RevokedTokenModel(base):
         """
         query = session.query(cls).filter_by(jti=jti).first()
         return bool(query)
+
+    @classmethod
+    def find_revoked_after(cls, id_):
+        """
+        Find tokens revoked after given row
+        :param id_: id of the last known row
+        :return: list of tuples (id, jti, blacklisted_on)
+        """
+        return session.query(cls.id_, cls.jti, cls.blacklisted_on).filter(cls.id_ > id_).order_by(cls.id_).all()
+
+    @classmethod
+    def delete_revoked_before(cls, timestamp):
+        """
+        Delete tokens revoked before given time, they are expired by then
+        :param timestamp: unix timestamp
+        :return: None
+        """
+        session.query(cls).filter(cls.blacklisted_on < datetime.utcfromtimestamp(timestamp)) \
+            .delete(synchronize_session=False)
+        session.commit()
+
+
+class RateLimitBucketModel(base):
+    __tablename__ = "rate_limit_buckets"
+    key = Column(String(255), primary_key=True)
+    tokens = Column(Float, nullable=False)
+    # unix time of the last take, shared by processes on different hosts
+    updated = Column(Float, nullable=False)
+
+    @classmethod
+    def take(cls, key, capacity, refill_rate, now):
+        """
+        Take one token from bucket, refilled by the time passed since the last take. The token is taken
+        by a single conditional UPDATE, so concurrent requests can't take the same token.
+        :param key: bucket key
+        :param capacity: maximal number of tokens, size of a burst
+        :param refill_rate: tokens added per second
+        :param now: unix time
+        :return: 0 if the token was taken, otherwise seconds until the bucket has one
+        """
+        refilled = cls.tokens + (now - cls.updated) * refill_rate
+        refilled = case((refilled > capacity, capacity), else_=refilled)
+        try:
+            taken = session.execute(update(cls).where(cls.key == key, refilled >= 1)
+                                    .values(tokens=refilled - 1, updated=now)
+                                    .execution_options(synchronize_session=False)).rowcount
+            tokens = None if taken else session.execute(select(refilled).where(cls.key == key)).scalar()
+            if not taken and tokens is None:
+                session.execute(insert(cls).values(key=key, tokens=capacity - 1, updated=now))
+                taken = True
+            session.commit()
+        except IntegrityError:
+            # another request created the bucket first
+            session.rollback()
+            return cls.take(key, capacity, refill_rate, now)
+        return 0 if taken else (1 - tokens) / refill_rate
+
+    @classmethod
+    def prune(cls, before):
+        """
+        Delete buckets not used since given time, they are full again and equal to missing ones
+        :param before: unix time
+        :return: None
+        """
+        session.execute(delete(cls).where(cls.updated < before).execution_options(synchronize_session=False))
+        session.commit()
@@ -0,0 +1,77 @@
+import base64
+import binascii
+
+from flask import request, jsonify
+
+from config import Config
+
+
+def encode_cursor(last_id):
+    """
+    Encode id of the last returned row into an opaque cursor
+    :param last_id: id of the last row of the page
+    :return: cursor string
+    """
+    return base64.urlsafe_b64encode(f"id:{last_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Decode opaque cursor into id of the last returned row
+    :param cursor: cursor string
+    :return: id of the last row of the previous page
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        prefix, last_id = raw.split(":", 1)
+        if prefix != "id":
+            raise ValueError
+        return int(last_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor.")
+
+
+def get_page_args(unbounded=False):
+    """
+    Read "cursor" and "limit" query parameters of the current request
+    :param unbounded: if True - "limit" is optional and not capped (used by streamed responses)
+    :return: tuple (after_id, limit), raises ValueError on invalid input
+    """
+    cursor = request.args.get("cursor")
+    after_id = decode_cursor(cursor) if cursor else 0
+    return after_id, get_limit_arg(None if unbounded else Config.DEFAULT_PAGE_LIMIT, unbounded=unbounded)
+
+
+def get_limit_arg(default, unbounded=False):
+    """
+    Read "limit" query parameter of the current request
+    :param default: limit used when parameter isn't given
+    :param unbounded: if True - limit is not capped
+    :return: limit, raises ValueError on invalid input
+    """
+    limit = request.args.get("limit")
+    if limit is None:
+        return default
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise ValueError('"limit" must be an integer.')
+    if limit < 1 or (not unbounded and limit > Config.MAX_PAGE_LIMIT):
+        raise ValueError(f'"limit" must be between 1 and {Config.MAX_PAGE_LIMIT}.')
+    return limit
+
+
+def paginated_response(items, limit, total=None):
+    """
+    Build json response for one page of rows, adding "X-Next-Cursor" header when the page is full
+    :param items: list of dict representations of rows, ordered by id
+    :param limit: requested page size
+    :param total: number of rows on all pages, sent as "X-Total-Count" header when given
+    :return: response
+    """
+    response = jsonify(items)
+    if items and len(items) >= limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(items[-1]["id"])
+    if total is not None:
+        response.headers["X-Total-Count"] = str(total)
+    return response
@@ -0,0 +1,166 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class MemoryBucketStore:
+    """
+    Token buckets kept in process memory, so every worker process limits clients on its own.
+    When there are more than maxsize buckets the least recently used one is dropped,
+    and the next request of its client starts with a full bucket.
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, refill_rate):
+        """
+        Take one token from bucket
+        :param key: bucket key
+        :param capacity: maximal number of tokens, size of a burst
+        :param refill_rate: tokens added per second
+        :return: 0 if the token was taken, otherwise seconds until the bucket has one
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * refill_rate)
+            if tokens >= 1:
+                tokens -= 1
+                wait = 0
+            else:
+                wait = (1 - tokens) / refill_rate
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class DatabaseBucketStore:
+    """
+    Token buckets kept in rate_limit_buckets table, shared by all processes using the database.
+    Buckets idle long enough to be full again are deleted every prune_every takes.
+    """
+
+    def __init__(self, prune_every=1000):
+        self.prune_every = prune_every
+        self._takes = 0
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, refill_rate):
+        """
+        Take one token from bucket
+        :param key: bucket key
+        :param capacity: maximal number of tokens, size of a burst
+        :param refill_rate: tokens added per second
+        :return: 0 if the token was taken, otherwise seconds until the bucket has one
+        """
+        from app.models import RateLimitBucketModel
+
+        now = time.time()
+        with self._lock:
+            self._takes += 1
+            prune = self._takes % self.prune_every == 0
+        if prune:
+            RateLimitBucketModel.prune(now - capacity / refill_rate)
+        return RateLimitBucketModel.take(key, capacity, refill_rate, now)
+
+
+class ConcurrencyLimiter:
+    """
+    Cap of requests doing the same expensive work at the same time in this process.
+    Requests over the cap wait at most `wait` seconds for a slot instead of queueing without limit.
+    """
+
+    def __init__(self, limit, wait=0):
+        self.limit = limit
+        self.wait = wait
+        self._semaphore = threading.BoundedSemaphore(limit) if limit > 0 else None
+        self._lock = threading.Lock()
+        self.active = 0
+
+    def acquire(self):
+        """
+        Take a slot
+        :return: True if the slot was taken, False if all slots are busy
+        """
+        if self._semaphore is None:
+            return True
+        if self.wait > 0:
+            acquired = self._semaphore.acquire(timeout=self.wait)
+        else:
+            acquired = self._semaphore.acquire(blocking=False)
+        if not acquired:
+            return False
+        with self._lock:
+            self.active += 1
+        return True
+
+    def release(self):
+        """
+        Give back a slot taken by acquire
+        :return: None
+        """
+        if self._semaphore is None:
+            return
+        with self._lock:
+            self.active -= 1
+        self._semaphore.release()
+
+
+class AuthLimits:
+    """
+    Admission control of endpoints hashing passwords: token buckets per email and per client IP,
+    and a cap of requests hashing at the same time. Without a bucket store only the cap applies.
+    The email bucket is the tight one; the IP bucket is shared by everyone behind a NAT (e.g. an
+    office) and only stops a single address from spraying many emails.
+    """
+
+    def __init__(self, store, ip_capacity, ip_rate, email_capacity, email_rate, hashing_limit, hashing_wait=0):
+        self.store = store
+        self.ip_limit = (ip_capacity, ip_rate)
+        self.email_limit = (email_capacity, email_rate)
+        self.hashing = ConcurrencyLimiter(hashing_limit, hashing_wait)
+        self.rejected = {"ip": 0, "email": 0, "hashing": 0}
+        self._lock = threading.Lock()
+
+    def wait(self, ip, email=None):
+        """
+        Take a token from buckets of the email the client logs in with and of the client's IP.
+        The email bucket is checked first, so requests it rejects don't drain the shared IP bucket.
+        :param ip: client address
+        :param email: email from request body, None - limit by IP only
+        :return: 0 if the request may proceed, otherwise seconds the client should wait
+        """
+        if self.store is None:
+            return 0
+        buckets = [("ip", f"ip:{ip}", self.ip_limit)]
+        if email:
+            buckets.insert(0, ("email", f"email:{email.strip().lower()}", self.email_limit))
+        for reason, key, (capacity, rate) in buckets:
+            wait = self.store.take(key, capacity, rate)
+            if wait:
+                self.reject(reason)
+                return wait
+        return 0
+
+    def reject(self, reason):
+        """
+        Count rejected request
+        :param reason: "ip", "email" or "hashing"
+        :return: None
+        """
+        with self._lock:
+            self.rejected[reason] += 1
+
+    def stats(self):
+        """
+        Return admission counters
+        :return: dict with rejected requests by reason and requests hashing now
+        """
+        with self._lock:
+            stats = {f"rejected_{reason}": count for reason, count in self.rejected.items()}
+        stats["hashing_active"] = self.hashing.active
+        return stats
@@ -0,0 +1,42 @@
+from flask import request, current_app, Response, stream_with_context
+
+from config import Config
+
+
+def stream_requested():
+    """
+    Check if the current request asks for a streamed response ("?stream=true")
+    :return: True or False
+    """
+    return request.args.get("stream", "").lower() in ("1", "true", "yes")
+
+
+def json_array_chunks(rows):
+    """
+    Serialize rows into a JSON array piece by piece, buffering output into chunks of
+    Config.STREAM_CHUNK_SIZE characters
+    :param rows: iterable of json serializable objects
+    :return: generator of string chunks
+    """
+    buffer = ["["]
+    size = 1
+    for i, row in enumerate(rows):
+        item = current_app.json.dumps(row)
+        if i:
+            item = "," + item
+        buffer.append(item)
+        size += len(item)
+        if size >= Config.STREAM_CHUNK_SIZE:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    buffer.append("]")
+    yield "".join(buffer)
+
+
+def stream_response(rows):
+    """
+    Build chunked json response which writes rows to the client while they are read from the database
+    :param rows: iterable of json serializable objects
+    :return: response
+    """
+    return Response(stream_with_context(json_array_chunks(rows)), mimetype="application/json")
@@ -3,3 +3,5 @@ from .menus import menus_bp
 from .employees import employees_bp
 from .choices import choices_bp
 from .auth import auth_bp
+from .cache import cache_bp
+from .metrics import metrics_bp
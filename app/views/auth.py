@@ -2,6 +2,7 @@ from flask import jsonify, request, Blueprint
 from flask_jwt_extended import (create_access_token, create_refresh_token,
                                 get_jwt, jwt_required, get_jwt_identity)
 from app.models import EmployeeModel, RevokedTokenModel
+from app.decorators import hashing_admission
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -16,6 +17,7 @@ def get_groups(employee):
 
 
 @auth_bp.route("/api/auth/registration", methods=["POST"])
+@hashing_admission
 def register():
     """
     Method for adding a new employee (registration)
@@ -56,6 +58,7 @@ def register():
 
 
 @auth_bp.route("/api/auth/login", methods=["POST"])
+@hashing_admission
 def login():
     """
     Method for logination
@@ -72,6 +75,9 @@ def login():
 
     groups = get_groups(current_employee)
     if EmployeeModel.verify_hash(password, current_employee.hashed_password):
+        if EmployeeModel.needs_rehash(current_employee.hashed_password):
+            current_employee.hashed_password = EmployeeModel.generate_hash(password)
+            current_employee.save_to_db()
         access_token = create_access_token(identity=email, additional_claims=groups)
         refresh_token = create_refresh_token(identity=email, additional_claims=groups)
         return {
@@ -111,7 +117,7 @@ def logout_access():
     jti = get_jwt()['jti']
     try:
         revoked_token = RevokedTokenModel(jti=jti)
-        revoked_token.add()
+        revoked_token.add(expires=get_jwt().get("exp"))
         return {'message': 'Access token has been revoked'}, 200
     except Exception as e:
         return {
@@ -130,7 +136,7 @@ def logout_refresh():
     jti = get_jwt()['jti']
     try:
         revoked_token = RevokedTokenModel(jti=jti)
-        revoked_token.add()
+        revoked_token.add(expires=get_jwt().get("exp"))
         return {"message": "Refresh token has been revoked"}, 200
     except Exception as e:
         return {
@@ -0,0 +1,18 @@
+from flask import jsonify, Blueprint
+from flask_jwt_extended import jwt_required
+
+from app.cache import read_cache
+from app.decorators import admin_group_required
+
+cache_bp = Blueprint('cache', __name__)
+
+
+@cache_bp.route("/api/cache/stats", methods=["GET"])
+@jwt_required()
+@admin_group_required
+def get_cache_stats():
+    """
+    Get read cache counters
+    :return: json with cache hits, misses, evictions and size
+    """
+    return jsonify(read_cache.stats())
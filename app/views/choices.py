@@ -1,9 +1,19 @@
+import math
+from concurrent import futures
 from datetime import date
+from itertools import chain
 
-from flask import jsonify, request, Blueprint
+from flask import jsonify, make_response, request, Blueprint
 from flask_jwt_extended import jwt_required, get_jwt
+from sqlalchemy.exc import IntegrityError
 
-from app.models import ChoicesModel, EmployeeModel
+from app.models import ChoicesModel, EmployeeModel, ChoiceTallyModel, MenusModel
+from app.decorators import admin_group_required
+from app.pagination import get_page_args, paginated_response
+from app.fieldsets import get_fieldset_args
+from app.streaming import stream_requested, stream_response
+from app.group_commit import choice_writer
+from app.choice_index import today_choices
 
 choices_bp = Blueprint('choices', __name__)
 
@@ -15,7 +25,12 @@ def get_choice(id_):
     :param id_: id of choice
     :return: json with choice info
     """
-    choice = ChoicesModel.find_by_id(id_)
+    try:
+        fields, expand = get_fieldset_args(ChoicesModel)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    choice = ChoicesModel.find_by_id(id_, fields=fields, expand=expand)
     if not choice:
         return jsonify({"message": "Choice not found."}), 404
 
@@ -28,11 +43,70 @@ def get_current_day_choices():
     Get current day choices
     :return: json with choices info
     """
-    choices = ChoicesModel.find_by_current_day(0, 500)
+    stream = stream_requested()
+    try:
+        after_id, limit = get_page_args(unbounded=stream)
+        fields, expand = get_fieldset_args(ChoicesModel)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    if stream:
+        choices = ChoicesModel.iter_current_day(after_id, limit, fields=fields, expand=expand)
+        first = next(choices, None)
+        if first is None:
+            return jsonify({"message": "Choices not found."}), 404
+        return stream_response(chain([first], choices))
+
+    choices = ChoicesModel.find_by_current_day(after_id, limit, fields=fields, expand=expand)
     if not choices:
         return jsonify({"message": "Choices not found."}), 404
 
-    return jsonify(choices)
+    return paginated_response(choices, limit)
+
+
+def get_day_arg():
+    """
+    Read "day" query parameter (YYYY-MM-DD) of the current request
+    :return: date, today by default, raises ValueError on invalid input
+    """
+    day = request.args.get("day")
+    if not day:
+        return date.today()
+    try:
+        return date.fromisoformat(day)
+    except ValueError:
+        raise ValueError('"day" must be a date in YYYY-MM-DD format.')
+
+
+@choices_bp.route("/api/choices/summary", methods=["GET"])
+def get_choices_summary():
+    """
+    Get number of choices per restaurant for a day
+    :return: json with restaurants and their number of choices
+    """
+    try:
+        day = get_day_arg()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    return jsonify(ChoiceTallyModel.summary(day))
+
+
+@choices_bp.route("/api/choices/summary/rebuild", methods=["POST"])
+@jwt_required()
+@admin_group_required
+def rebuild_choices_summary():
+    """
+    Recount number of choices per restaurant for a day from the choices table
+    :return: json with restaurants and their number of choices
+    """
+    try:
+        day = get_day_arg()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    ChoiceTallyModel.rebuild(day)
+    return jsonify(ChoiceTallyModel.summary(day))
 
 
 @choices_bp.route("/api/choices/", methods=["POST"])
@@ -45,18 +119,37 @@ def create_choice():
     if not request.json:
         return jsonify({"message": 'Please, specify "menu_id".'}), 400
     email = get_jwt().get("sub")
-    current_employee = EmployeeModel.find_by_email(email)
+    current_employee = EmployeeModel.find_by_email(email, to_dict=False)
 
     menu_id = request.json.get("menu_id")
 
     if not menu_id:
         return jsonify({"message": 'Please, specify menu_id.'}), 400
-
-    if ChoicesModel.find_by_employee_id(current_employee['id'], to_dict=False):
+    if not isinstance(menu_id, int) or isinstance(menu_id, bool) \
+            or not MenusModel.find_by_id(menu_id, to_dict=False):
+        return jsonify({"message": "Menu not found."}), 400
+
+    if choice_writer.enabled:
+        try:
+            choice_id = choice_writer.submit(current_employee.id, menu_id)
+        except futures.TimeoutError:
+            # the choice stays queued and may still be saved, a retry then gets "already choosen"
+            response = make_response(jsonify({"message": "Choices are saved slowly, please retry later"}), 503)
+            response.headers["Retry-After"] = str(math.ceil(choice_writer.timeout))
+            return response
+        if choice_id is None:
+            return jsonify({"message": 'You have already choosen'}), 400
+        return jsonify({"id": choice_id}), 201
+
+    if today_choices.get(current_employee.id):
+        return jsonify({"message": 'You have already choosen'}), 400
+    choice = ChoicesModel(current_day=date.today(),
+                          employee_id=current_employee.id, menu_id=menu_id)
+    try:
+        choice.save_to_db()
+    except IntegrityError:
+        # chosen through another worker, whose write this worker's index hasn't seen yet
         return jsonify({"message": 'You have already choosen'}), 400
-    choice = ChoicesModel(current_day=date.today().strftime("%Y-%m-%d"),
-                          employee_id=current_employee['id'], menu_id=menu_id)
-    choice.save_to_db()
 
     return jsonify({"id": choice.id}), 201
 
@@ -70,7 +163,7 @@ def update_choice(id_):
     :return: json with message "Updated"
     """
     email = get_jwt().get("sub")
-    current_employee = EmployeeModel.find_by_email(email)
+    current_employee = EmployeeModel.find_by_email(email, expand=())
 
     choice = ChoicesModel.find_by_id(id_, to_dict=False)
     if not choice:
@@ -83,9 +176,13 @@ def update_choice(id_):
 
     if menu_id:
         choice.menu_id = menu_id
-        choice.current_day = date.today().strftime("%Y-%m-%d")
+        choice.current_day = date.today()
 
-    choice.save_to_db()
+    try:
+        choice.save_to_db()
+    except IntegrityError:
+        # an older choice moved to today, when there's already a choice for today
+        return jsonify({"message": 'You have already choosen'}), 400
 
     return jsonify({"message": "Updated"})
 
@@ -99,7 +196,7 @@ def delete_choice(id_):
     :return: json with message "Deleted"
     """
     email = get_jwt().get("sub")
-    current_employee = EmployeeModel.find_by_email(email)
+    current_employee = EmployeeModel.find_by_email(email, expand=())
 
     choice = ChoicesModel.find_by_id(id_, to_dict=False)
     if not choice:
@@ -1,14 +1,44 @@
+from datetime import date
+
 from flask import jsonify, request, Blueprint
 from flask_jwt_extended import jwt_required, get_jwt
 
-from app.models import EmployeeModel
-from app.decorators import admin_group_required
+from app.models import ChoicesModel, EmployeeModel
+from app.decorators import admin_group_required, conditional_get
+from app.pagination import get_page_args, paginated_response
+from app.fieldsets import get_fieldset_args
+from app.streaming import stream_requested, stream_response
+from app.bulk import read_rows, parse_bool, bulk_response
 
 employees_bp = Blueprint('employees', __name__)
 
 
+def get_default_expand():
+    """
+    Relations expanded when "expand" isn't given: all for a lookup by name or email, none for a list
+    :return: None (all of EmployeeModel's EXPANSIONS) or empty tuple
+    """
+    lookup = bool(request.args.get("firstname") and request.args.get("lastname") or request.args.get("email"))
+    return None if lookup else ()
+
+
+def employee_tables(default_expand=None):
+    """
+    Build function for conditional_get returning tables read for employee representations
+    with relations expanded by "expand" query parameter of the current request
+    :param default_expand: function returning relations expanded when "expand" isn't given
+    :return: function
+    """
+    def tables():
+        _, expand = get_fieldset_args(EmployeeModel, default_expand and default_expand())
+        return ("employees", "choices", "menu", "restaurant") if "choices" in expand else ("employees",)
+    return tables
+
+
+# embedded choices are the ones of the last days, so representations also depend on the date
 @employees_bp.route("/api/employees/", methods=["GET"])
 @jwt_required()
+@conditional_get(employee_tables(get_default_expand), key=date.today)
 def get_employees():
     """
     Get all employees or by name
@@ -17,25 +47,48 @@ def get_employees():
     firstname = request.args.get("firstname")
     lastname = request.args.get("lastname")
     email = request.args.get("email")
+    try:
+        fields, expand = get_fieldset_args(EmployeeModel, default_expand=get_default_expand())
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
     if firstname and lastname:
-        employee = EmployeeModel.find_by_name(firstname, lastname)
+        employee = EmployeeModel.find_by_name(firstname, lastname, fields=fields, expand=expand)
     elif email:
-        employee = EmployeeModel.find_by_email(email)
+        employee = EmployeeModel.find_by_email(email, fields=fields, expand=expand)
     else:
-        employee = EmployeeModel.return_all(0, 500)
+        stream = stream_requested()
+        try:
+            after_id, limit = get_page_args(unbounded=stream)
+        except ValueError as e:
+            return jsonify({"message": str(e)}), 400
+        if stream:
+            return stream_response(EmployeeModel.iter_all(after_id, limit, fields=fields, expand=expand))
+        employees = EmployeeModel.return_all(after_id, limit, fields=fields, expand=expand)
+        return paginated_response(employees, limit, total=EmployeeModel.count_all())
     return jsonify(employee)
 
 
 @employees_bp.route("/api/employees/inactive", methods=["GET"])
 @jwt_required()
 @admin_group_required
+@conditional_get(employee_tables(lambda: ()), key=date.today)
 def get_inactive_employees():
     """
     Get all inactive employees
     :return: json with employees info
     """
-    employee = EmployeeModel.return_all_inactive(0, 500)
-    return jsonify(employee)
+    stream = stream_requested()
+    try:
+        after_id, limit = get_page_args(unbounded=stream)
+        fields, expand = get_fieldset_args(EmployeeModel, default_expand=())
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    if stream:
+        return stream_response(EmployeeModel.iter_all(after_id, limit, is_active=False, fields=fields, expand=expand))
+
+    employees = EmployeeModel.return_all_inactive(after_id, limit, fields=fields, expand=expand)
+    return paginated_response(employees, limit, total=EmployeeModel.count_all(is_active=False))
 
 
 @employees_bp.route("/api/employees/current", methods=["GET"])
@@ -45,8 +98,13 @@ def get_current_employee():
     Get current employee info by jwt email
     :return: json with user info
     """
+    try:
+        fields, expand = get_fieldset_args(EmployeeModel)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
     email = get_jwt().get("sub")
-    current_employee = EmployeeModel.find_by_email(email)
+    current_employee = EmployeeModel.find_by_email(email, fields=fields, expand=expand)
     return jsonify(current_employee)
 
 
@@ -58,13 +116,55 @@ def get_employee(id_):
     :param id_: id of employee
     :return: json with employee info
     """
-    employee = EmployeeModel.find_by_id(id_)
+    try:
+        fields, expand = get_fieldset_args(EmployeeModel)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    employee = EmployeeModel.find_by_id(id_, fields=fields, expand=expand)
     if not employee:
         return jsonify({"message": "Employee not found."}), 404
 
     return jsonify(employee)
 
 
+def get_date_range_args():
+    """
+    Read "from" and "to" query parameters (YYYY-MM-DD) of the current request
+    :return: tuple (date_from, date_to), None when parameter isn't given, raises ValueError on invalid input
+    """
+    dates = []
+    for name in ("from", "to"):
+        value = request.args.get(name)
+        try:
+            dates.append(date.fromisoformat(value) if value else None)
+        except ValueError:
+            raise ValueError(f'"{name}" must be a date in YYYY-MM-DD format.')
+    return tuple(dates)
+
+
+@employees_bp.route("/api/employees/<int:id_>/choices", methods=["GET"])
+@jwt_required()
+def get_employee_choices(id_):
+    """
+    Get choices of employee, optionally within a range of days
+    :param id_: id of employee
+    :return: json with choices info
+    """
+    try:
+        after_id, limit = get_page_args()
+        date_from, date_to = get_date_range_args()
+        fields, expand = get_fieldset_args(ChoicesModel, default_expand=())
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    if not EmployeeModel.find_by_id(id_, to_dict=False):
+        return jsonify({"message": "Employee not found."}), 404
+
+    choices = ChoicesModel.find_by_employee(id_, after_id, limit, date_from, date_to, fields=fields, expand=expand)
+    return paginated_response(choices, limit)
+
+
 @employees_bp.route("/api/employees/", methods=["POST"])
 @jwt_required()
 @admin_group_required
@@ -94,6 +194,50 @@ def create_employee():
     return jsonify({"id": employee.id}), 201
 
 
+@employees_bp.route("/api/employees/bulk", methods=["POST"])
+@jwt_required()
+@admin_group_required
+def bulk_create_employees():
+    """
+    Create many employees as admin from CSV or JSON Lines rows
+    :return: json with number of created employees and per-row errors
+    """
+    try:
+        rows = read_rows()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    errors = []
+    valid = {}
+    for number, row in rows:
+        firstname = row.get("firstname")
+        lastname = row.get("lastname")
+        email = row.get("email")
+        password = row.get("password")
+        is_admin = parse_bool(row.get("is_admin"))
+        if not firstname or not lastname or not email or not password or is_admin is None:
+            errors.append({"row": number, "message": 'Please, specify "firstname", "lastname", "email", '
+                                                     '"password" and "is_admin".'})
+        elif email in valid:
+            errors.append({"row": number, "message": f"Email {email} is repeated in row {valid[email][0]}"})
+        else:
+            valid[email] = (number, firstname, lastname, password, is_admin)
+
+    for email in EmployeeModel.find_active_emails(valid):
+        errors.append({"row": valid.pop(email)[0], "message": f"Email {email} already used"})
+
+    rows = list(valid.items())
+    hashes = EmployeeModel.generate_hashes([password for _, (_, _, _, password, _) in rows])
+    mappings = [
+        {"firstname": firstname, "lastname": lastname, "email": email, "hashed_password": hashed_password,
+         "is_admin": is_admin, "is_active": True}
+        for (email, (_, firstname, lastname, _, is_admin)), hashed_password in zip(rows, hashes)
+    ]
+    if mappings:
+        EmployeeModel.bulk_insert(mappings)
+    return bulk_response(len(mappings), errors)
+
+
 @employees_bp.route("/api/employees/<int:id_>", methods=["PATCH"])
 @jwt_required()
 def update_employee(id_):
@@ -156,7 +300,7 @@ def delete_employee(id_):
     :param id_: id of employee
     :return: json with message "Deleted"
     """
-    employee = EmployeeModel.find_by_id(id_)
+    employee = EmployeeModel.find_by_id(id_, expand=())
     if not employee:
         return jsonify({"message": "Employee not found."}), 404
     email = get_jwt().get("sub")
@@ -1,31 +1,124 @@
+from datetime import date
+
 from flask import jsonify, request, Blueprint
 from flask_jwt_extended import jwt_required
 
+from config import Config
 from app.models import MenusModel, RestaurantModel
-from app.decorators import admin_group_required
+from app.menu_search import MenuSearch
+from app.decorators import admin_group_required, conditional_get, expanded_tables
+from app.pagination import get_page_args, get_limit_arg, paginated_response
+from app.fieldsets import get_fieldset_args
+from app.streaming import stream_requested, stream_response
+from app.bulk import read_rows, bulk_response
+
+DAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+# relations embedded into list items unless ?expand= is given
+LIST_EXPAND = ()
 
 menus_bp = Blueprint('menus', __name__)
 
 
 @menus_bp.route("/api/menus/", methods=["GET"])
+@conditional_get(expanded_tables(MenusModel, default_expand=LIST_EXPAND))
 def get_menus():
     """
     Get all menus
     :return: json with menus info
     """
-    menus = MenusModel.return_all(0, 500)
+    stream = stream_requested()
+    try:
+        after_id, limit = get_page_args(unbounded=stream)
+        fields, expand = get_fieldset_args(MenusModel, default_expand=LIST_EXPAND)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    if stream:
+        return stream_response(MenusModel.iter_all(after_id, limit, fields=fields, expand=expand))
+
+    menus = MenusModel.return_all(after_id, limit, fields=fields, expand=expand)
+
+    return paginated_response(menus, limit)
+
+
+def get_menus_of_day(day):
+    """
+    Get dishes of all menus for day of week
+    :param day: day of week
+    :return: json with menus of the day
+    """
+    try:
+        after_id, limit = get_page_args()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    menus = MenusModel.find_by_day(day, after_id, limit)
+
+    return paginated_response(menus, limit)
+
+
+@menus_bp.route("/api/menus/today", methods=["GET"])
+@conditional_get("menu", "restaurant", key=lambda: date.today().weekday())
+def get_today_menus():
+    """
+    Get dishes of all menus for today
+    :return: json with menus of the day
+    """
+    return get_menus_of_day(DAYS[date.today().weekday()])
+
+
+@menus_bp.route("/api/menus/day/<string:weekday>", methods=["GET"])
+@conditional_get("menu", "restaurant")
+def get_day_menus(weekday):
+    """
+    Get dishes of all menus for day of week
+    :param weekday: day of week, e.g. monday
+    :return: json with menus of the day
+    """
+    day = weekday.lower()
+    if day not in DAYS:
+        return jsonify({"message": f'Day must be one of: {", ".join(DAYS)}.'}), 400
+
+    return get_menus_of_day(day)
 
-    return jsonify(menus)
+
+@menus_bp.route("/api/menus/search", methods=["GET"])
+@conditional_get("menu", "restaurant")
+def search_menus():
+    """
+    Search dishes and restaurant names of menus, best matches first
+    :return: json with matching menus and their dishes of the day
+    """
+    terms = MenuSearch.terms(request.args.get("q", ""))
+    if not terms:
+        return jsonify({"message": '"q" must contain at least one word.'}), 400
+    day = request.args.get("day")
+    if day is not None:
+        day = day.lower()
+        if day not in DAYS:
+            return jsonify({"message": f'Day must be one of: {", ".join(DAYS)}.'}), 400
+    try:
+        limit = get_limit_arg(Config.MENU_SEARCH_LIMIT)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    return jsonify(MenuSearch.search(terms, day, limit))
 
 
 @menus_bp.route("/api/menus/<int:id_>", methods=["GET"])
+@conditional_get(expanded_tables(MenusModel))
 def get_menu(id_):
     """
     Get menu info by id
     :param id_: id of menu
     :return: json with menu info
     """
-    menu = MenusModel.find_by_id(id_)
+    try:
+        fields, expand = get_fieldset_args(MenusModel)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    menu = MenusModel.find_by_id(id_, fields=fields, expand=expand)
     if not menu:
         return jsonify({"message": "Menu not found."}), 404
 
@@ -71,6 +164,47 @@ def create_menu():
     return jsonify({"id": menu.id}), 201
 
 
+@menus_bp.route("/api/menus/bulk", methods=["POST"])
+@jwt_required()
+@admin_group_required
+def bulk_create_menus():
+    """
+    Create many menus from CSV or JSON Lines rows
+    :return: json with number of created menus and per-row errors
+    """
+    try:
+        rows = read_rows()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    errors = []
+    valid = {}
+    for number, row in rows:
+        try:
+            restaurant_id = int(row.get("restaurant_id"))
+        except (TypeError, ValueError):
+            restaurant_id = None
+        if not restaurant_id or not all(row.get(day) for day in DAYS):
+            errors.append({"row": number, "message": 'Please, specify restaurant_id, monday, '
+                                                     'tuesday, wednesday, thursday, friday, saturday, sunday.'})
+        elif restaurant_id in valid:
+            errors.append({"row": number, "message": f"Restaurant {restaurant_id} is repeated in row "
+                                                     f"{valid[restaurant_id][0]}"})
+        else:
+            valid[restaurant_id] = (number, {day: row[day] for day in DAYS})
+
+    existing = RestaurantModel.find_existing_ids(valid)
+    for restaurant_id in set(valid) - existing:
+        errors.append({"row": valid.pop(restaurant_id)[0], "message": "Restaurant not found."})
+    for restaurant_id in MenusModel.find_restaurant_ids_with_menu(valid):
+        errors.append({"row": valid.pop(restaurant_id)[0], "message": "This restaurant already has a menu."})
+
+    mappings = [dict(days, restaurant_id=restaurant_id) for restaurant_id, (_, days) in valid.items()]
+    if mappings:
+        MenusModel.bulk_insert(mappings)
+    return bulk_response(len(mappings), errors)
+
+
 @menus_bp.route("/api/menus/<int:id_>", methods=["PATCH"])
 @jwt_required()
 @admin_group_required
@@ -0,0 +1,24 @@
+from flask import Response, Blueprint, current_app
+
+from app.blocklist import revocation_cache
+from app.cache import read_cache
+from app.metrics import metrics
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+@metrics_bp.route("/api/metrics", methods=["GET"])
+def get_metrics():
+    """
+    Get request, database and cache metrics
+    :return: metrics in Prometheus text format
+    """
+    cache_stats = read_cache.stats()
+    gauges = {f"lunch_read_cache_{name}": (f"Read cache {name}.", value) for name, value in cache_stats.items()}
+    gauges["lunch_revoked_tokens"] = ("Revoked tokens remembered by the blocklist cache.",
+                                      revocation_cache.stats()["revoked_tokens"])
+    for name, value in current_app.extensions["auth_limits"].stats().items():
+        gauges[f"lunch_auth_{name}"] = (f"Login and registration admission {name.replace('_', ' ')}.", value)
+    for phase, seconds in current_app.extensions.get("startup_timings", {}).items():
+        gauges[f"lunch_startup_{phase}_seconds"] = (f"Duration of {phase} startup phase.", seconds)
+    return Response(metrics.render(gauges), mimetype="text/plain; version=0.0.4")
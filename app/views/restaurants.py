@@ -2,31 +2,55 @@ from flask import jsonify, request, Blueprint
 from flask_jwt_extended import jwt_required
 
 from app.models import RestaurantModel
-from app.decorators import admin_group_required
+from app.decorators import admin_group_required, conditional_get, expanded_tables
+from app.pagination import get_page_args, paginated_response
+from app.fieldsets import get_fieldset_args
+from app.streaming import stream_requested, stream_response
+from app.bulk import read_rows, bulk_response
 
 
+# relations embedded into list items unless ?expand= is given
+LIST_EXPAND = ("menus",)
+
 restaurants_bp = Blueprint('restaurants', __name__)
 
 
 @restaurants_bp.route("/api/restaurants/", methods=["GET"])
+@conditional_get(expanded_tables(RestaurantModel, default_expand=LIST_EXPAND))
 def get_restaurants():
     """
     Get all restaurants
     :return: json with restaurants info
     """
-    restaurants = RestaurantModel.return_all(0, 500)
+    stream = stream_requested()
+    try:
+        after_id, limit = get_page_args(unbounded=stream)
+        fields, expand = get_fieldset_args(RestaurantModel, default_expand=LIST_EXPAND)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    if stream:
+        return stream_response(RestaurantModel.iter_all(after_id, limit, fields=fields, expand=expand))
+
+    restaurants = RestaurantModel.return_all(after_id, limit, fields=fields, expand=expand)
 
-    return jsonify(restaurants)
+    return paginated_response(restaurants, limit)
 
 
 @restaurants_bp.route("/api/restaurants/<int:id_>", methods=["GET"])
+@conditional_get(expanded_tables(RestaurantModel))
 def get_restaurant(id_):
     """
     Get restaurant info by id
     :param id_: id of restaurant
     :return: json with restaurant info
     """
-    restaurant = RestaurantModel.find_by_id(id_)
+    try:
+        fields, expand = get_fieldset_args(RestaurantModel)
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    restaurant = RestaurantModel.find_by_id(id_, fields=fields, expand=expand)
     if not restaurant:
         return jsonify({"message": "Restaurant not found."}), 404
 
@@ -54,6 +78,33 @@ def create_restaurant():
     return jsonify({"id": restaurant.id}), 201
 
 
+@restaurants_bp.route("/api/restaurants/bulk", methods=["POST"])
+@jwt_required()
+@admin_group_required
+def bulk_create_restaurants():
+    """
+    Create many restaurants from CSV or JSON Lines rows
+    :return: json with number of created restaurants and per-row errors
+    """
+    try:
+        rows = read_rows()
+    except ValueError as e:
+        return jsonify({"message": str(e)}), 400
+
+    errors = []
+    mappings = []
+    for number, row in rows:
+        name = row.get("name")
+        if not name:
+            errors.append({"row": number, "message": 'Please, specify "name".'})
+        else:
+            mappings.append({"name": name})
+
+    if mappings:
+        RestaurantModel.bulk_insert(mappings)
+    return bulk_response(len(mappings), errors)
+
+
 @restaurants_bp.route("/api/restaurants/<int:id_>", methods=["PATCH"])
 @jwt_required()
 @admin_group_required
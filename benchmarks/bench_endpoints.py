@@ -0,0 +1,218 @@
+"""
+Endpoint benchmarks over a production sized dataset.
+
+For every route the latency (fastest of BENCH_ITERATIONS requests), the number of
+SQL statements and the peak traced memory of one request are measured and compared
+with benchmarks/baselines.json for the seeded dataset (see seed.py for volumes):
+
+    python -m pytest benchmarks
+
+Latency is stored relative to a reference request, which runs one query and returns
+a small JSON document, timed between requests of the route on the same machine, so
+baselines recorded on one machine hold on another.
+A route fails when it runs more queries than its baseline, or its relative latency or peak
+memory exceed the baseline by more than BENCH_LATENCY_TOLERANCE / BENCH_MEMORY_TOLERANCE
+(fractions, default 0.5 and 0.25). Run with BENCH_UPDATE_BASELINES=1 to record new baselines.
+Read cache is cleared before every request, so cold database paths are measured; table
+versions of conditional GETs stay cached, as they are between requests of a busy worker.
+Memory is traced from the start of request handling to the response, session teardown
+is not traced. Like timeit, requests are measured with the garbage collector disabled,
+which keeps collections of earlier garbage out of the timings; it's run between routes.
+"""
+import gc
+import json
+import os
+import time
+import tracemalloc
+
+import pytest
+
+from seed import ADMIN_EMAIL, PASSWORD, BENCH_DIR, database_uri, dataset_key, seed_database
+
+os.environ["SQLALCHEMY_DATABASE_URI"] = database_uri()
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret-key-benchmark-secret-key")
+# conditional GETs look table versions up once per TABLE_VERSIONS_TTL, not per request,
+# a long TTL keeps that lookup out of the measured request whatever the route's latency
+os.environ.setdefault("TABLE_VERSIONS_TTL", "3600")
+
+ITERATIONS = int(os.getenv("BENCH_ITERATIONS", 10))
+# reference requests per request of a route
+REFERENCE_ITERATIONS = 5
+REFERENCE_URL = "/bench/reference"
+TRACE_MEMORY = "bench.trace_memory"
+PEAK_MEMORY_HEADER = "X-Bench-Peak-Memory"
+LATENCY_TOLERANCE = float(os.getenv("BENCH_LATENCY_TOLERANCE", 0.5))
+MEMORY_TOLERANCE = float(os.getenv("BENCH_MEMORY_TOLERANCE", 0.25))
+UPDATE_BASELINES = os.getenv("BENCH_UPDATE_BASELINES", "").lower() in ("1", "true", "yes")
+BASELINES_PATH = os.path.join(BENCH_DIR, "baselines.json")
+
+ROUTES = [
+    ("GET", "/api/restaurants/", None),
+    ("GET", "/api/restaurants/1", None),
+    ("GET", "/api/menus/", None),
+    ("GET", "/api/menus/1", None),
+    ("GET", "/api/menus/search?q=pho&day=thursday", None),
+    ("GET", "/api/employees/", "admin"),
+    ("GET", "/api/employees/inactive", "admin"),
+    ("GET", "/api/employees/2", "admin"),
+    ("GET", "/api/employees/current", "admin"),
+    ("GET", "/api/choices/current", "admin"),
+    ("GET", "/api/choices/summary", "admin"),
+]
+
+
+def load_baselines():
+    if not os.path.exists(BASELINES_PATH):
+        return {}
+    with open(BASELINES_PATH) as file:
+        return json.load(file)
+
+
+@pytest.fixture(scope="session")
+def baselines():
+    data = load_baselines()
+    yield data.setdefault(dataset_key(), {})
+    if UPDATE_BASELINES:
+        with open(BASELINES_PATH, "w") as file:
+            json.dump(data, file, indent=2, sort_keys=True)
+            file.write("\n")
+
+
+@pytest.fixture(scope="session")
+def app():
+    from flask import jsonify, request
+    from sqlalchemy import text
+    from app.main import create_app
+    from app.database.database import db, session
+    from app.hashing import hashing_pool
+
+    seed_database(db)
+    app = create_app()
+    app.testing = True
+
+    @app.route(REFERENCE_URL)
+    def reference():
+        return jsonify({"value": session.execute(text("SELECT 1")).scalar()})
+
+    @app.before_request
+    def start_tracing():
+        if request.environ.get(TRACE_MEMORY):
+            tracemalloc.start()
+
+    @app.after_request
+    def stop_tracing(response):
+        # after_request runs before the teardown, which removes the session
+        if tracemalloc.is_tracing():
+            response.headers[PEAK_MEMORY_HEADER] = str(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        return response
+
+    yield app
+    # hashing processes outliving the session keep pytest's output pipe open
+    hashing_pool.shutdown()
+
+
+@pytest.fixture(scope="session")
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture(scope="session")
+def admin_headers(client):
+    response = client.post("/api/auth/login", json={"email": ADMIN_EMAIL, "password": PASSWORD})
+    assert response.status_code == 201, response.json
+    return {"Authorization": f"Bearer {response.json['access_token']}"}
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def elapsed_ms(call):
+    started = time.perf_counter()
+    call()
+    return (time.perf_counter() - started) * 1000
+
+
+def best_ms(request, reference, iterations):
+    """
+    Fastest times of a request and of the reference request, which is timed between the requests,
+    so both are timed under the same load of the machine
+    """
+    request()
+    reference()
+    latencies, reference_latencies = [], []
+    for _ in range(iterations):
+        latencies.append(elapsed_ms(request))
+        reference_latencies += [elapsed_ms(reference) for _ in range(REFERENCE_ITERATIONS)]
+    return min(latencies), min(reference_latencies)
+
+
+def measure(client, method, url, headers):
+    gc.collect()
+    gc.disable()
+    try:
+        return _measure(client, method, url, headers)
+    finally:
+        gc.enable()
+
+
+def _measure(client, method, url, headers):
+    from sqlalchemy import event
+    from app.cache import read_cache
+    from app.database.database import db
+
+    def request(environ=None):
+        read_cache.clear()
+        response = client.open(url, method=method, headers=headers, environ_overrides=environ)
+        assert response.status_code < 400, (url, response.status_code)
+        return response
+
+    def reference():
+        assert client.get(REFERENCE_URL).status_code == 200
+
+    latency_ms, reference_ms = best_ms(request, reference, ITERATIONS)
+
+    counter = QueryCounter()
+    event.listen(db, "before_cursor_execute", counter)
+    try:
+        request()
+    finally:
+        event.remove(db, "before_cursor_execute", counter)
+
+    peak = int(request({TRACE_MEMORY: True}).headers[PEAK_MEMORY_HEADER])
+
+    result = {
+        "latency": round(latency_ms / reference_ms, 2),
+        "queries": counter.count,
+        "peak_kb": round(peak / 1024, 1),
+    }
+    return result, latency_ms
+
+
+@pytest.mark.parametrize("method, url, auth", ROUTES, ids=[f"{method} {url}" for method, url, _ in ROUTES])
+def test_endpoint(client, admin_headers, baselines, method, url, auth):
+    headers = admin_headers if auth == "admin" else {}
+    result, latency_ms = measure(client, method, url, headers)
+    key = f"{method} {url}"
+    baseline = baselines.get(key)
+    print(f"\n{key}: {result['latency']} x reference ({latency_ms:.2f} ms), {result['queries']} queries, "
+          f"{result['peak_kb']} KiB peak"
+          + (f" (baseline {baseline['latency']} x, {baseline['queries']} queries, {baseline['peak_kb']} KiB)"
+             if baseline else ""))
+
+    if UPDATE_BASELINES:
+        baselines[key] = result
+        return
+    if baseline is None:
+        pytest.skip(f"No baseline for {key} on dataset {dataset_key()}, run with BENCH_UPDATE_BASELINES=1")
+
+    assert result["queries"] <= baseline["queries"], f"{key} runs {result['queries']} queries"
+    assert result["latency"] <= baseline["latency"] * (1 + LATENCY_TOLERANCE), \
+        f"{key} latency regressed to {result['latency']} x reference"
+    assert result["peak_kb"] <= baseline["peak_kb"] * (1 + MEMORY_TOLERANCE), \
+        f"{key} peak memory regressed to {result['peak_kb']} KiB"
@@ -0,0 +1,95 @@
+"""
+Choice submission throughput benchmark.
+
+Measures how many POST /api/choices/ requests per second the app serves from a fixed
+number of request threads, with every choice committed by its request thread and with
+group commit (CHOICE_GROUP_COMMIT), against a temporary SQLite database:
+
+    python benchmarks/choice_throughput.py --threads 32 --requests 2000 --interval-ms 5
+
+Every request is made by a different employee, so all of them create a choice.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Measure POST /api/choices/ throughput with and without group commit")
+    parser.add_argument("--threads", type=int, default=32, help="concurrent request threads")
+    parser.add_argument("--requests", type=int, default=1000, help="choices per mode")
+    parser.add_argument("--interval-ms", type=float, default=5, help="group commit batch interval")
+    return parser.parse_args()
+
+
+def run_choices(app, tokens, threads):
+    pending = list(tokens)
+    lock = threading.Lock()
+    failures = []
+
+    def worker():
+        client = app.test_client()
+        while True:
+            with lock:
+                if not pending:
+                    return
+                token = pending.pop()
+            response = client.post("/api/choices/", json={"menu_id": 1},
+                                   headers={"Authorization": f"Bearer {token}"})
+            if response.status_code != 201:
+                failures.append(response.status_code)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - started, failures
+
+
+def main():
+    args = parse_args()
+    db_dir = tempfile.mkdtemp(prefix="lunch-bench-")
+    os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(db_dir, 'bench.db')}"
+    os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret-key-0123456789abcdef")
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from flask_jwt_extended import create_access_token
+    from app.main import create_app
+    from app.database.database import base, db
+    from app.group_commit import choice_writer
+    from app.models import EmployeeModel, MenusModel, RestaurantModel
+
+    app = create_app()
+    base.metadata.create_all(db)
+    RestaurantModel.bulk_insert([{"id": 1, "name": "bench"}])
+    MenusModel.bulk_insert([dict({day: "bench" for day in ("monday", "tuesday", "wednesday", "thursday",
+                                                           "friday", "saturday", "sunday")},
+                                 id=1, restaurant_id=1)])
+    emails = [f"e{i}@bench.test" for i in range(2 * args.requests)]
+    EmployeeModel.bulk_insert([
+        {"firstname": "bench", "lastname": "bench", "email": email, "hashed_password": "-",
+         "is_active": True, "is_admin": False}
+        for email in emails
+    ])
+    with app.app_context():
+        tokens = [create_access_token(identity=email) for email in emails]
+
+    print(f"{'mode':>12} {'threads':>7} {'choices':>7} {'seconds':>8} {'req/s':>8}")
+    for mode, enabled, mode_tokens in (("per request", False, tokens[:args.requests]),
+                                       ("group commit", True, tokens[args.requests:])):
+        choice_writer.configure(enabled=enabled, interval=args.interval_ms / 1000)
+        elapsed, failures = run_choices(app, mode_tokens, args.threads)
+        if failures:
+            print(f"{mode:>12} failed choices: {len(failures)}", file=sys.stderr)
+        print(f"{mode:>12} {args.threads:>7} {args.requests:>7} {elapsed:>8.2f} {args.requests / elapsed:>8.1f}")
+    choice_writer.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+JSON serialization benchmark.
+
+Measures how long it takes to build the response of a 500-item /api/menus/ page with
+Flask's default stdlib provider and with the app's JSONProvider (stdlib fallback, orjson,
+and pre-built bytes of a cached page), against a temporary SQLite database:
+
+    python benchmarks/json_serialization.py --menus 500 --choices 5 --repeat 200
+
+With --choices > 0 every menu embeds its choices (?expand=choices), which adds dates to the payload.
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+DAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare JSON serialization time of a /api/menus/ page")
+    parser.add_argument("--menus", type=int, default=500, help="menus on the page")
+    parser.add_argument("--choices", type=int, default=0, help="choices embedded into every menu")
+    parser.add_argument("--repeat", type=int, default=200, help="serializations per provider")
+    return parser.parse_args()
+
+
+def measure(app, provider, page, repeat):
+    timings = []
+    with app.test_request_context():
+        for _ in range(repeat):
+            started = time.perf_counter()
+            provider.response(page).get_data()
+            timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main():
+    args = parse_args()
+    db_dir = tempfile.mkdtemp(prefix="lunch-bench-")
+    os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(db_dir, 'bench.db')}"
+    os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret-key-0123456789abcdef")
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from flask.json.provider import DefaultJSONProvider
+    from app.main import create_app
+    from app.database.database import db
+    from app.models import RestaurantModel, MenusModel, EmployeeModel, ChoicesModel
+    import app.json_provider as json_provider
+
+    app = create_app()
+    RestaurantModel.bulk_insert([{"id": i, "name": f"Restaurant {i}"} for i in range(1, args.menus + 1)])
+    MenusModel.bulk_insert([dict({day: f"Soup {i}, Salad, Steak with fries" for day in DAYS}, id=i, restaurant_id=i)
+                            for i in range(1, args.menus + 1)])
+    if args.choices:
+        EmployeeModel.bulk_insert([{"id": i, "firstname": "First", "lastname": f"Last {i}",
+                                    "email": f"e{i}@bench.test", "hashed_password": "-", "is_active": True,
+                                    "is_admin": False}
+                                   for i in range(1, args.choices + 1)])
+        with db.begin() as connection:
+            connection.execute(ChoicesModel.__table__.insert(), [
+                {"current_day": date.today() - timedelta(days=day), "employee_id": employee_id, "menu_id": menu_id}
+                for menu_id in range(1, args.menus + 1) for day, employee_id in enumerate(range(1, args.choices + 1))
+            ])
+    expand = ("choices", "choices.employee") if args.choices else ()
+
+    def page():
+        return MenusModel.return_all(0, args.menus, expand=expand)
+
+    providers = [("flask stdlib", DefaultJSONProvider(app), lambda: list(page()))]
+    if json_provider.orjson is not None:
+        providers.append(("orjson", app.json, lambda: list(page())))
+    providers.append(("cached bytes", app.json, page))
+
+    print(f"{'provider':>14} {'items':>6} {'bytes':>9} {'median ms':>10}")
+    for name, provider, get_page in providers:
+        payload = get_page()
+        with app.test_request_context():
+            size = len(provider.response(payload).get_data())
+        print(f"{name:>14} {len(payload):>6} {size:>9} {measure(app, provider, payload, args.repeat) * 1000:>10.3f}")
+
+    orjson, json_provider.orjson = json_provider.orjson, None
+    payload = list(page())
+    with app.test_request_context():
+        size = len(app.json.response(payload).get_data())
+    seconds = measure(app, app.json, payload, args.repeat)
+    print(f"{'app stdlib':>14} {len(payload):>6} {size:>9} {seconds * 1000:>10.3f}")
+    json_provider.orjson = orjson
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Login throughput benchmark.
+
+Measures how many /api/auth/login requests per second the app serves from
+a fixed number of request threads for several sizes of the hashing process pool,
+against a temporary SQLite database:
+
+    python benchmarks/login_throughput.py --pool-sizes 0 1 2 4 8 --threads 16 --requests 400
+
+Pool size 0 hashes inline in the request threads. Rate limits and the hashing concurrency cap
+are off unless RATE_LIMIT_ENABLED / HASH_MAX_CONCURRENT are set, so every login is hashed.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Measure /api/auth/login throughput per hashing pool size")
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[0, 1, 2, 4])
+    parser.add_argument("--threads", type=int, default=16, help="concurrent request threads")
+    parser.add_argument("--requests", type=int, default=200, help="logins per pool size")
+    parser.add_argument("--rounds", type=int, default=None, help="PBKDF2 rounds, default - Config.PBKDF2_ROUNDS")
+    return parser.parse_args()
+
+
+def run_logins(app, total, threads):
+    remaining = [total]
+    lock = threading.Lock()
+    failures = []
+
+    def worker():
+        client = app.test_client()
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+            response = client.post("/api/auth/login", json={"email": "bench", "password": "bench"})
+            if response.status_code != 201:
+                failures.append(response.status_code)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - started, failures
+
+
+def main():
+    args = parse_args()
+    db_dir = tempfile.mkdtemp(prefix="lunch-bench-")
+    os.environ["SQLALCHEMY_DATABASE_URI"] = f"sqlite:///{os.path.join(db_dir, 'bench.db')}"
+    os.environ.setdefault("JWT_SECRET_KEY", "benchmark-secret-key-0123456789abcdef")
+    os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+    os.environ.setdefault("HASH_MAX_CONCURRENT", "0")
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+    from app.main import create_app
+    from app.hashing import hashing_pool
+
+    hashing_pool.configure(size=0, rounds=args.rounds)
+    app = create_app()
+    app.test_client().post("/api/auth/registration", json={
+        "firstname": "bench", "lastname": "bench", "email": "bench", "password": "bench", "is_admin": False,
+    })
+
+    print(f"{'pool size':>9} {'threads':>7} {'logins':>6} {'seconds':>8} {'req/s':>8}")
+    for size in args.pool_sizes:
+        hashing_pool.configure(size=size)
+        hashing_pool.start()
+        elapsed, failures = run_logins(app, args.requests, args.threads)
+        if failures:
+            print(f"{size:>9} failed logins: {len(failures)}", file=sys.stderr)
+        print(f"{size:>9} {args.threads:>7} {args.requests:>6} {elapsed:>8.2f} {args.requests / elapsed:>8.1f}")
+    hashing_pool.shutdown()
+
+
+if __name__ == "__main__":
+    main()
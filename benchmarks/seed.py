@@ -0,0 +1,115 @@
+"""
+Seeding of the benchmark database with production sized data.
+
+Volumes are taken from environment variables:
+    BENCH_EMPLOYEES    - number of employees, 10% of them inactive (default 10000)
+    BENCH_RESTAURANTS  - number of restaurants, each with a menu (default 500)
+    BENCH_DAYS         - days of choice history ending today (default 365)
+
+The defaults are the dataset of the committed baselines, other volumes get their own baselines.
+    BENCH_DATABASE_URI - database to seed, e.g. a local Postgres (default - SQLite file in benchmarks/.data)
+
+All employees have password "bench", employee 1 (admin@bench.test) is an admin.
+"""
+import os
+import random
+from datetime import date, timedelta
+
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+EMPLOYEES = int(os.getenv("BENCH_EMPLOYEES", 10000))
+RESTAURANTS = int(os.getenv("BENCH_RESTAURANTS", 500))
+DAYS = int(os.getenv("BENCH_DAYS", 365))
+CHOICE_RATE = 0.8
+BATCH = 10000
+
+ADMIN_EMAIL = "admin@bench.test"
+PASSWORD = "bench"
+
+DISHES = ["Soup", "Pho", "Borsch", "Pizza", "Burger", "Salad", "Ramen", "Curry", "Pasta", "Tacos",
+          "Sushi", "Falafel", "Steak", "Risotto", "Dumplings", "Paella", "Goulash", "Shawarma"]
+
+
+def dataset_key():
+    """
+    Name of the seeded dataset, baselines are stored per dataset
+    """
+    return f"{EMPLOYEES}e-{RESTAURANTS}r-{DAYS}d"
+
+
+def database_uri():
+    """
+    Url of the benchmark database
+    """
+    if os.getenv("BENCH_DATABASE_URI"):
+        return os.getenv("BENCH_DATABASE_URI")
+    data_dir = os.path.join(BENCH_DIR, ".data")
+    os.makedirs(data_dir, exist_ok=True)
+    return f"sqlite:///{os.path.join(data_dir, f'bench-{dataset_key()}.sqlite')}"
+
+
+def _insert(connection, table, rows):
+    for start in range(0, len(rows), BATCH):
+        connection.execute(table.insert(), rows[start:start + BATCH])
+
+
+def seed_database(engine):
+    """
+    Create schema and fill it with benchmark data, an already seeded database is reused
+    :param engine: database engine
+    :return: None
+    """
+    from sqlalchemy import func, select, text
+    from app.database.database import base
+    from app.database.migrations import upgrade
+    from app.hashing import hashing_pool
+    from app.menu_search import MenuSearch
+    from app.models import RestaurantModel, MenusModel, EmployeeModel, ChoicesModel
+
+    base.metadata.create_all(engine)
+    upgrade(engine)
+    with engine.connect() as connection:
+        if connection.execute(select(func.count()).select_from(EmployeeModel.__table__)).scalar():
+            return
+
+    rng = random.Random(2022)
+    hashed_password = hashing_pool.hash(PASSWORD)
+    today = date.today()
+
+    restaurants = [{"id": i, "name": f"Restaurant {i}"} for i in range(1, RESTAURANTS + 1)]
+    menus = [
+        dict({day: ", ".join(rng.sample(DISHES, 4)) for day in
+              ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")},
+             id=i, restaurant_id=i)
+        for i in range(1, RESTAURANTS + 1)
+    ]
+    employees = [
+        {"id": i, "firstname": f"First{i}", "lastname": f"Last{i}",
+         "email": ADMIN_EMAIL if i == 1 else f"e{i}@bench.test", "hashed_password": hashed_password,
+         "is_admin": i == 1, "is_active": i == 1 or rng.random() > 0.1}
+        for i in range(1, EMPLOYEES + 1)
+    ]
+
+    with engine.begin() as connection:
+        _insert(connection, RestaurantModel.__table__, restaurants)
+        _insert(connection, MenusModel.__table__, menus)
+        _insert(connection, EmployeeModel.__table__, employees)
+
+        choices = []
+        for offset in range(DAYS - 1, -1, -1):
+            day = today - timedelta(days=offset)
+            for employee_id in range(1, EMPLOYEES + 1):
+                if employee_id == 1 or rng.random() < CHOICE_RATE:
+                    choices.append({"current_day": day, "employee_id": employee_id,
+                                    "menu_id": rng.randint(1, RESTAURANTS)})
+            if len(choices) >= BATCH:
+                _insert(connection, ChoicesModel.__table__, choices)
+                choices = []
+        _insert(connection, ChoicesModel.__table__, choices)
+
+        connection.execute(text("INSERT INTO choice_tally (current_day, menu_id, count) "
+                                "SELECT current_day, menu_id, count(*) FROM choices GROUP BY current_day, menu_id"))
+        MenuSearch.rebuild(connection)
+    with engine.connect() as connection:
+        connection.execute(text("ANALYZE"))
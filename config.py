@@ -11,4 +11,47 @@ class Config(object):
     SQLALCHEMY_DATABASE_URI = os.environ.get('SQLALCHEMY_DATABASE_URI') or os.getenv("DB_STRING")
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY")
     JWT_BLACKLIST_ENABLED = True
-    JWT_BLACKLIST_TOKEN_CHECKS = ['access', 'refresh']
\ No newline at end of file
+    JWT_BLACKLIST_TOKEN_CHECKS = ['access', 'refresh']
+    DEFAULT_PAGE_LIMIT = int(os.getenv("DEFAULT_PAGE_LIMIT", 500))
+    MAX_PAGE_LIMIT = int(os.getenv("MAX_PAGE_LIMIT", 1000))
+    STREAM_BATCH_SIZE = int(os.getenv("STREAM_BATCH_SIZE", 500))
+    STREAM_CHUNK_SIZE = int(os.getenv("STREAM_CHUNK_SIZE", 64 * 1024))
+    READ_CACHE_SIZE = int(os.getenv("READ_CACHE_SIZE", 1024))
+    READ_CACHE_TTL = float(os.getenv("READ_CACHE_TTL", 60))
+    TABLE_VERSIONS_TTL = float(os.getenv("TABLE_VERSIONS_TTL", 1))
+    JWT_BLOCKLIST_REFRESH_SECONDS = float(os.getenv("JWT_BLOCKLIST_REFRESH_SECONDS", 5))
+    SQLALCHEMY_POOL_SIZE = int(os.getenv("SQLALCHEMY_POOL_SIZE", 10))
+    SQLALCHEMY_MAX_OVERFLOW = int(os.getenv("SQLALCHEMY_MAX_OVERFLOW", 20))
+    SQLALCHEMY_POOL_TIMEOUT = float(os.getenv("SQLALCHEMY_POOL_TIMEOUT", 30))
+    SQLALCHEMY_POOL_RECYCLE = int(os.getenv("SQLALCHEMY_POOL_RECYCLE", 1800))
+    SQLALCHEMY_POOL_PRE_PING = os.getenv("SQLALCHEMY_POOL_PRE_PING", "true").lower() == "true"
+    HASH_POOL_SIZE = int(os.getenv("HASH_POOL_SIZE", os.cpu_count() or 1))
+    HASH_TIMEOUT_SECONDS = float(os.getenv("HASH_TIMEOUT_SECONDS", 10))
+    HASH_POOL_AFTER_FORK = os.getenv("HASH_POOL_AFTER_FORK", "false").lower() == "true"
+    PBKDF2_ROUNDS = int(os.getenv("PBKDF2_ROUNDS", 29000))
+    BULK_IMPORT_MAX_ROWS = int(os.getenv("BULK_IMPORT_MAX_ROWS", 50000))
+    CHOICE_GROUP_COMMIT = os.getenv("CHOICE_GROUP_COMMIT", "false").lower() == "true"
+    CHOICE_GROUP_COMMIT_INTERVAL_MS = float(os.getenv("CHOICE_GROUP_COMMIT_INTERVAL_MS", 5))
+    CHOICE_GROUP_COMMIT_MAX_BATCH = int(os.getenv("CHOICE_GROUP_COMMIT_MAX_BATCH", 500))
+    CHOICE_GROUP_COMMIT_TIMEOUT_SECONDS = float(os.getenv("CHOICE_GROUP_COMMIT_TIMEOUT_SECONDS", 10))
+    EMPLOYEE_RECENT_CHOICES_DAYS = int(os.getenv("EMPLOYEE_RECENT_CHOICES_DAYS", 30))
+    MENU_SEARCH_LIMIT = int(os.getenv("MENU_SEARCH_LIMIT", 20))
+    STARTUP_CREATE_SCHEMA = os.getenv("STARTUP_CREATE_SCHEMA", "true").lower() == "true"
+    STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "true").lower() == "true"
+    STARTUP_POOL_CONNECTIONS = int(os.getenv("STARTUP_POOL_CONNECTIONS", SQLALCHEMY_POOL_SIZE))
+    COMPRESS_RESPONSES = os.getenv("COMPRESS_RESPONSES", "true").lower() == "true"
+    COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", 1024))
+    COMPRESSION_LEVEL = int(os.getenv("COMPRESSION_LEVEL", 6))
+    COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", 5))
+    COMPRESSION_CACHE_SIZE = int(os.getenv("COMPRESSION_CACHE_SIZE", 256))
+    COMPRESSION_CACHE_TTL = float(os.getenv("COMPRESSION_CACHE_TTL", 3600))
+    RATE_LIMIT_ENABLED = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")
+    RATE_LIMIT_IP_BURST = int(os.getenv("RATE_LIMIT_IP_BURST", 300))
+    RATE_LIMIT_IP_PER_MINUTE = float(os.getenv("RATE_LIMIT_IP_PER_MINUTE", 300))
+    RATE_LIMIT_EMAIL_BURST = int(os.getenv("RATE_LIMIT_EMAIL_BURST", 5))
+    RATE_LIMIT_EMAIL_PER_MINUTE = float(os.getenv("RATE_LIMIT_EMAIL_PER_MINUTE", 5))
+    RATE_LIMIT_MEMORY_BUCKETS = int(os.getenv("RATE_LIMIT_MEMORY_BUCKETS", 100000))
+    HASH_MAX_CONCURRENT = int(os.getenv("HASH_MAX_CONCURRENT", max(HASH_POOL_SIZE, 1) * 2))
+    HASH_ADMISSION_WAIT_SECONDS = float(os.getenv("HASH_ADMISSION_WAIT_SECONDS", 0.5))
+    HASH_RETRY_AFTER_SECONDS = int(os.getenv("HASH_RETRY_AFTER_SECONDS", 1))
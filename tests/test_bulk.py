@@ -0,0 +1,20 @@
+def test_bulk_create_restaurants(client, app, authentication_headers):
+    headers = dict(authentication_headers(is_admin=True), **{"Content-Type": "text/csv"})
+    response = client.post('/api/restaurants/bulk', data="name\nKFC\n\n", headers=headers)
+    assert response.status_code == 201 and response.json["inserted"] == 1 and response.json["errors"] == []
+
+
+def test_bulk_create_employees(client, app, authentication_headers):
+    headers = dict(authentication_headers(is_admin=True), **{"Content-Type": "application/x-ndjson"})
+    rows = [
+        '{"firstname": "Jane", "lastname": "Roe", "email": "jane@test.test", "password": "pass", "is_admin": false}',
+        '{"firstname": "John", "lastname": "Doe", "email": "test@test.test", "password": "pass", "is_admin": false}',
+    ]
+    response = client.post('/api/employees/bulk', data="\n".join(rows), headers=headers)
+    assert response.json["inserted"] == 1
+    assert response.json["errors"] == [{"row": 2, "message": "Email test@test.test already used"}]
+
+
+def test_bulk_create_menus_wrong_format(client, app, authentication_headers):
+    response = client.post('/api/menus/bulk', json=[], headers=authentication_headers(is_admin=True))
+    assert response.status_code == 400
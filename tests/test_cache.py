@@ -0,0 +1,28 @@
+def test_cached_restaurant(client, app, authentication_headers):
+    headers = authentication_headers(is_admin=True)
+    client.get('/api/restaurants/1')
+    hits = client.get('/api/cache/stats', headers=headers).json["hits"]
+    response = client.get('/api/restaurants/1')
+    assert response.json['name'] == "McDonald's"
+    assert client.get('/api/cache/stats', headers=headers).json["hits"] == hits + 1
+
+
+def test_cache_invalidated_on_update(client, app, authentication_headers):
+    headers = authentication_headers(is_admin=True)
+    client.get('/api/menus/1')
+    client.patch('/api/menus/1', json={"monday": "Borsch"}, headers=headers)
+    assert client.get('/api/menus/1').json['monday'] == "Borsch"
+    client.patch('/api/menus/1', json={"monday": "Soup"}, headers=headers)
+
+
+def test_instances_are_not_cached(app):
+    from app.cache import read_cache
+    from app.models import RestaurantModel
+
+    read_cache.clear()
+    restaurant = RestaurantModel.find_by_id(1, False)
+    assert isinstance(restaurant, RestaurantModel)
+    assert RestaurantModel.find_by_id(1, to_dict=False) is not None
+    assert read_cache.stats()["size"] == 0
+    assert RestaurantModel.find_by_id(1) == RestaurantModel.find_by_id(id_=1, to_dict=True)
+    assert read_cache.stats()["size"] == 1
@@ -0,0 +1,75 @@
+from datetime import date
+
+
+def test_index_follows_writes(app):
+    from app.choice_index import TodayChoicesIndex
+
+    index = TodayChoicesIndex()
+    index.get(0)
+    index.track(10 ** 6, 8001, 1, date.today())
+    assert index.get(8001) == (10 ** 6, 1)
+    assert index.page(10 ** 6 - 1) == [10 ** 6]
+
+    index.discard(10 ** 6)
+    assert index.get(8001) is None
+    index.track(10 ** 6 + 1, 8001, 1, date(2000, 1, 1))
+    assert index.get(8001) is None
+
+
+def test_index_rolls_over_to_new_day(app):
+    from app.choice_index import TodayChoicesIndex
+    from app.models import ChoicesModel
+
+    index = TodayChoicesIndex()
+    index.track(10 ** 6, 8001, 1, date.today())
+    index._day = date(2000, 1, 1)
+    assert index.get(8001) is None
+    assert index.page(0) == sorted(id_ for id_, _, _ in ChoicesModel.find_day_index(date.today()))
+
+
+def test_choice_missed_by_index_is_not_duplicated(client, app, authentication_headers, monkeypatch):
+    from app.choice_index import today_choices
+
+    headers = authentication_headers(is_admin=False)
+    choice_id = client.post('/api/choices/', json={"menu_id": 1}, headers=headers).json["id"]
+    try:
+        # index of this worker hasn't seen the choice yet, the database rejects the second one
+        monkeypatch.setattr(today_choices, "get", lambda employee_id: None)
+        response = client.post('/api/choices/', json={"menu_id": 1}, headers=headers)
+        assert response.status_code == 400
+    finally:
+        monkeypatch.undo()
+        client.delete(f'/api/choices/{choice_id}', headers=headers)
+
+
+def test_index_follows_own_writes_and_reloads_on_others(client, app, authentication_headers, monkeypatch):
+    from app.cache import table_versions
+    from app.choice_index import today_choices
+    from app.database.database import Session
+    from app.models import ChoicesModel, ChoiceTallyModel, TableVersionModel
+
+    monkeypatch.setattr(table_versions, "ttl", 0)
+    reloads = []
+    find_day_index = ChoicesModel.find_day_index
+    monkeypatch.setattr(ChoicesModel, "find_day_index", lambda day: reloads.append(day) or find_day_index(day))
+
+    headers = authentication_headers(is_admin=False)
+    today_choices.page(0)
+    reloads.clear()
+    choice_id = client.post('/api/choices/', json={"menu_id": 1}, headers=headers).json["id"]
+    try:
+        assert today_choices.page(choice_id - 1) == [choice_id]
+        assert reloads == []
+
+        # written like another worker would, so the index of this process doesn't see it
+        other = ChoicesModel(current_day=date.today(), employee_id=8002, menu_id=1)
+        Session.add(other)
+        ChoiceTallyModel.adjust(date.today(), 1, 1)
+        TableVersionModel.bump("choices")
+        Session.commit()
+        assert today_choices.get(8002) == (other.id, 1)
+        assert len(reloads) == 1
+        ChoicesModel.delete_by_id(other.id)
+        Session.remove()
+    finally:
+        client.delete(f'/api/choices/{choice_id}', headers=headers)
@@ -0,0 +1,33 @@
+def test_choices_summary(client, app, authentication_headers):
+    headers = authentication_headers(is_admin=False)
+    response = client.post('/api/choices/', json={"menu_id": 1}, headers=headers)
+    choice_id = response.json["id"]
+
+    response = client.get('/api/choices/summary')
+    assert response.json[0]['restaurant'] == "McDonald's" and response.json[0]['count'] == 1
+
+    response = client.post('/api/choices/summary/rebuild', headers=authentication_headers(is_admin=True))
+    assert response.json[0]['count'] == 1
+
+    client.delete(f'/api/choices/{choice_id}', headers=headers)
+    assert client.get('/api/choices/summary').json == []
+
+
+def test_choices_summary_invalid_day(client, app):
+    assert client.get('/api/choices/summary?day=yesterday').status_code == 400
+
+
+def test_tally_upsert(app):
+    from datetime import date
+    from app.models import ChoiceTallyModel
+    from app.database.database import Session
+
+    day = date(2000, 1, 3)
+    try:
+        for _ in range(2):
+            ChoiceTallyModel.adjust(day, 1, 1)
+            Session.commit()
+        assert Session.query(ChoiceTallyModel.count).filter_by(current_day=day, menu_id=1).scalar() == 2
+    finally:
+        ChoiceTallyModel.rebuild(day)
+        Session.remove()
@@ -0,0 +1,39 @@
+import gzip
+
+
+def test_gzip_response(client, app, monkeypatch):
+    from app.compression import compressor
+
+    monkeypatch.setattr(compressor, "min_size", 0)
+    response = client.get('/api/menus/', headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert app.json.loads(gzip.decompress(response.data)) == client.get('/api/menus/').json
+
+    etag, weak = response.get_etag()
+    assert weak
+    response = client.get('/api/menus/', headers={"Accept-Encoding": "gzip", "If-None-Match": f'W/"{etag}"'})
+    assert response.status_code == 304
+
+
+def test_small_response_not_compressed(client, app, monkeypatch):
+    from app.compression import compressor
+
+    monkeypatch.setattr(compressor, "min_size", 1024 * 1024)
+    response = client.get('/api/menus/', headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert "Content-Encoding" not in response.headers
+
+
+def test_precompressed_static_file(client, app):
+    response = client.get('/static/swagger.yaml', headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "gzip"
+    with open(app.static_folder + "/swagger.yaml", "rb") as file:
+        assert gzip.decompress(response.data) == file.read()
+    response.close()
+
+    response = client.get('/static/swagger.yaml')
+    assert "Content-Encoding" not in response.headers
+    response.close()
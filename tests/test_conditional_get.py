@@ -0,0 +1,112 @@
+def test_not_modified_until_table_changes(client, app, authentication_headers):
+    headers = authentication_headers(is_admin=True)
+    response = client.get('/api/restaurants/')
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+    assert response.headers["Last-Modified"]
+
+    response = client.get('/api/restaurants/', headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+    assert response.headers["ETag"] == etag
+
+    menu = client.get('/api/menus/1').json
+    client.patch('/api/menus/1', json={"monday": menu["monday"]}, headers=headers)
+    response = client.get('/api/restaurants/', headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+def test_etag_depends_on_query(client, app):
+    first = client.get('/api/menus/?limit=1')
+    second = client.get('/api/menus/?limit=2')
+    assert first.headers["ETag"] != second.headers["ETag"]
+    response = client.get('/api/menus/?limit=1', headers={"If-None-Match": first.headers["ETag"]})
+    assert response.status_code == 304
+
+
+def test_change_by_other_process(client, app, monkeypatch):
+    from app.cache import table_versions
+    from app.database.database import Session
+    from app.models import RestaurantModel, TableVersionModel
+
+    # versions are looked up by every request, the ones seen at startup included
+    monkeypatch.setattr(table_versions, "ttl", 0)
+    table_versions.expire("restaurant")
+    first = client.get('/api/restaurants/1')
+    name = first.json["name"]
+
+    def rename(new_name):
+        # written like another worker would, so the read cache of this process is not invalidated
+        Session.query(RestaurantModel).filter_by(id=1).update({"name": new_name}, synchronize_session=False)
+        TableVersionModel.bump("restaurant")
+        Session.commit()
+        Session.remove()
+
+    rename(name + " renamed")
+    try:
+        second = client.get('/api/restaurants/1', headers={"If-None-Match": first.headers["ETag"]})
+        assert second.status_code == 200
+        assert second.headers["ETag"] != first.headers["ETag"]
+        assert second.json["name"] == name + " renamed"
+    finally:
+        rename(name)
+
+
+def test_etag_depends_on_expanded_tables(client, app, authentication_headers):
+    headers = authentication_headers(is_admin=False)
+    plain = client.get('/api/menus/')
+    expanded = client.get('/api/menus/?expand=choices')
+    choice_id = client.post('/api/choices/', json={"menu_id": 1}, headers=headers).json["id"]
+    try:
+        response = client.get('/api/menus/', headers={"If-None-Match": plain.headers["ETag"]})
+        assert response.status_code == 304
+        response = client.get('/api/menus/?expand=choices', headers={"If-None-Match": expanded.headers["ETag"]})
+        assert response.status_code == 200
+    finally:
+        client.delete(f'/api/choices/{choice_id}', headers=headers)
+    assert client.get('/api/menus/?expand=unknown').status_code == 400
+
+
+def test_total_count_follows_other_process(client, app, authentication_headers, monkeypatch):
+    from app.cache import table_versions
+    from app.database.database import Session
+    from app.models import EmployeeModel, TableVersionModel
+
+    headers = authentication_headers(is_admin=True)
+    monkeypatch.setattr(table_versions, "ttl", 0)
+    table_versions.expire("employees")
+    total = int(client.get('/api/employees/', headers=headers).headers["X-Total-Count"])
+
+    # written like another worker would, so the read cache of this process is not invalidated
+    employee = EmployeeModel(firstname="Other", lastname="Worker", email="otherworker", hashed_password="-",
+                             is_active=True, is_admin=False)
+    Session.add(employee)
+    TableVersionModel.bump("employees")
+    Session.commit()
+    try:
+        response = client.get('/api/employees/', headers=headers)
+        assert response.headers["X-Total-Count"] == str(total + 1)
+    finally:
+        EmployeeModel.delete_by_id(employee.id)
+        Session.remove()
+
+
+def test_version_increased_once_per_transaction(app):
+    from app.database.database import Session
+    from app.models import TableVersionModel
+
+    def version():
+        return Session.query(TableVersionModel.version).filter_by(table_name="restaurant").scalar() or 0
+
+    before = version()
+    TableVersionModel.bump("restaurant")
+    TableVersionModel.bump("restaurant")
+    Session.commit()
+    assert version() == before + 1
+
+    TableVersionModel.bump("restaurant")
+    Session.rollback()
+    Session.commit()
+    assert version() == before + 1
+    Session.remove()
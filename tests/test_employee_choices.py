@@ -0,0 +1,26 @@
+from datetime import date, timedelta
+
+
+def test_employee_choices_by_range(client, app, authentication_headers):
+    from app.models import ChoicesModel
+
+    headers = authentication_headers(is_admin=True)
+    old_day = date.today() - timedelta(days=400)
+    choice = ChoicesModel(current_day=old_day, employee_id=1, menu_id=1)
+    choice.save_to_db()
+    try:
+        response = client.get(f'/api/employees/1/choices?from={old_day}&to={old_day}', headers=headers)
+        assert response.status_code == 200
+        assert response.json == [{"id": choice.id, "current_day": old_day.isoformat(),
+                                  "restaurant": "McDonald's"}]
+
+        recent = client.get('/api/employees/1', headers=headers).json["choices"]
+        assert choice.id not in [recent_choice["id"] for recent_choice in recent]
+    finally:
+        ChoicesModel.delete_by_id(choice.id)
+
+
+def test_employee_choices_errors(client, app, authentication_headers):
+    headers = authentication_headers(is_admin=True)
+    assert client.get('/api/employees/1/choices?from=yesterday', headers=headers).status_code == 400
+    assert client.get('/api/employees/100000/choices', headers=headers).status_code == 404
@@ -0,0 +1,65 @@
+def test_list_without_history(client, app):
+    response = client.get('/api/restaurants/')
+    assert response.status_code == 200
+    assert "choices" not in response.json[0]["menus"]
+    assert "choices" not in client.get('/api/menus/').json[0]
+
+
+def test_detail_expands_all(client, app):
+    response = client.get('/api/menus/1')
+    assert response.status_code == 200
+    assert "choices" in response.json
+
+
+def test_sparse_fields(client, app):
+    response = client.get('/api/menus/?fields=restaurant,monday')
+    assert response.status_code == 200
+    assert set(response.json[0]) == {"id", "restaurant", "monday"}
+
+    response = client.get('/api/restaurants/1?fields=name&expand=')
+    assert response.json == {"id": 1, "name": "McDonald's"}
+
+
+def test_sparse_fields_load_only_their_columns(client, app, authentication_headers):
+    from sqlalchemy import event
+    from app.cache import read_cache
+    from app.database.database import db
+
+    headers = authentication_headers(is_admin=True)
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    read_cache.clear()
+    event.listen(db, "before_cursor_execute", capture)
+    try:
+        menus = client.get('/api/menus/?fields=id').json
+        choices = client.get('/api/choices/current?fields=current_day', headers=headers)
+        employees = client.get('/api/employees/?fields=email', headers=headers).json
+    finally:
+        event.remove(db, "before_cursor_execute", capture)
+    assert set(menus[0]) == {"id"}
+    assert choices.status_code in (200, 404)
+    assert set(employees[0]) == {"id", "email"}
+    selects = [statement for statement in statements if "FROM menu" in statement or "FROM employees" in statement]
+    assert selects
+    assert not any("menu.monday" in statement or "employees.hashed_password" in statement for statement in selects)
+
+
+def test_nested_expand(client, app):
+    response = client.get('/api/restaurants/?expand=menus.choices')
+    assert response.status_code == 200
+    assert "choices" in response.json[0]["menus"]
+
+
+def test_unknown_field(client, app):
+    assert client.get('/api/restaurants/?fields=address').status_code == 400
+    assert client.get('/api/menus/1?expand=employees').status_code == 400
+
+
+def test_employee_without_choices(client, app, authentication_headers):
+    headers = authentication_headers(is_admin=True)
+    response = client.get('/api/employees/1?expand=', headers=headers)
+    assert response.status_code == 200
+    assert "choices" not in response.json
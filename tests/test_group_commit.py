@@ -0,0 +1,73 @@
+from concurrent import futures
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+EMPLOYEE_IDS = (9001, 9002, 9003)
+
+
+@pytest.fixture
+def writer(app):
+    from app.group_commit import ChoiceWriter
+    from app.database.database import Session
+    from app.models import ChoicesModel
+
+    writer = ChoiceWriter(True, 0.2, 500, 10)
+    yield writer
+    writer.shutdown()
+    choice_ids = [id_ for id_, in Session.query(ChoicesModel.id).filter(ChoicesModel.employee_id.in_(EMPLOYEE_IDS))]
+    for id_ in choice_ids:
+        ChoicesModel.delete_by_id(id_)
+    Session.remove()
+
+
+def test_group_commit_answers_every_caller(writer):
+    from app.models import ChoicesModel
+
+    employee_ids = [9001, 9002, 9003, 9001]
+    with ThreadPoolExecutor(len(employee_ids)) as pool:
+        ids = list(pool.map(lambda employee_id: writer.submit(employee_id, 1), employee_ids))
+
+    assert ids.count(None) == 1
+    new_ids = [id_ for id_ in ids if id_ is not None]
+    assert len(set(new_ids)) == 3
+    for id_ in new_ids:
+        assert ChoicesModel.find_by_id(id_, to_dict=False).menu_id == 1
+    assert writer.submit(9002, 1) is None
+
+
+def test_failed_batch_fails_only_the_bad_choice(writer):
+    from app.models import ChoicesModel
+
+    # too large for an integer column
+    selections = [(9001, 1), (9002, 2 ** 64), (9003, 1)]
+    with ThreadPoolExecutor(len(selections)) as pool:
+        results = [pool.submit(writer.submit, employee_id, menu_id) for employee_id, menu_id in selections]
+
+    with pytest.raises(Exception):
+        results[1].result()
+    for result in (results[0], results[2]):
+        assert ChoicesModel.find_by_id(result.result(), to_dict=False).menu_id == 1
+
+
+def test_create_choice_checks_menu(client, authentication_headers):
+    headers = authentication_headers(is_admin=False)
+
+    for menu_id in ("1", 1.5, True, 999999):
+        response = client.post('/api/choices/', json={"menu_id": menu_id}, headers=headers)
+        assert response.status_code == 400
+        assert response.json["message"] == "Menu not found."
+
+
+def test_create_choice_timeout(client, authentication_headers, monkeypatch):
+    from app.group_commit import choice_writer
+
+    def submit(employee_id, menu_id):
+        raise futures.TimeoutError()
+
+    monkeypatch.setattr(choice_writer, "enabled", True)
+    monkeypatch.setattr(choice_writer, "submit", submit)
+    response = client.post('/api/choices/', json={"menu_id": 1}, headers=authentication_headers(is_admin=False))
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "10"
@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+
+def test_rehash_on_login(client, app, authentication_headers):
+    from app.hashing import hashing_pool
+    from app.models import EmployeeModel
+
+    authentication_headers(is_admin=True)
+    rounds = hashing_pool.rounds
+    hashing_pool.configure(rounds=rounds + 1)
+    try:
+        authentication_headers(is_admin=True)
+        with app.app_context():
+            employee = EmployeeModel.find_by_email("admintest", to_dict=False)
+            assert not EmployeeModel.needs_rehash(employee.hashed_password)
+    finally:
+        hashing_pool.configure(rounds=rounds)
+
+
+def test_start_runs_workers(app):
+    from app.hashing import HashingPool
+
+    pool = HashingPool(2, 1000, 10)
+    try:
+        pool.start()
+        assert len(pool._executor._processes) == 2
+        assert all(process.is_alive() for process in pool._executor._processes.values())
+    finally:
+        pool.shutdown()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+def test_pool_started_in_forked_workers(app):
+    from app.hashing import hashing_pool
+
+    size = hashing_pool.size
+    hashing_pool.shutdown()
+    hashing_pool.configure(size=1)
+    hashing_pool.start_in_workers()
+    try:
+        assert hashing_pool._executor is None
+        pid = os.fork()
+        if pid == 0:
+            # started by the fork hook, before any request
+            executor = hashing_pool._executor
+            started = executor is not None and all(process.is_alive() for process in executor._processes.values())
+            hashing_pool.shutdown()
+            os._exit(0 if started else 1)
+        _, status = os.waitpid(pid, 0)
+        assert os.waitstatus_to_exitcode(status) == 0
+        assert hashing_pool._executor is None
+    finally:
+        hashing_pool._master_pid = None
+        hashing_pool.configure(size=size)
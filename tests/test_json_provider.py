@@ -0,0 +1,23 @@
+from datetime import date, datetime
+
+
+def test_dates_in_iso_format(app, monkeypatch):
+    import app.json_provider as json_provider
+
+    data = {"day": date(2022, 10, 19), "at": datetime(2022, 10, 19, 12, 30), "ids": [1, 2]}
+    fast = app.json.dumps(data)
+    monkeypatch.setattr(json_provider, "orjson", None)
+    assert app.json.loads(fast) == app.json.loads(app.json.dumps(data)) == {
+        "day": "2022-10-19", "at": "2022-10-19T12:30:00", "ids": [1, 2]}
+
+
+def test_json_list_is_serialized_once(app):
+    from app.json_provider import JSONList
+
+    rows = JSONList([{"id": 1, "day": date(2022, 10, 19)}])
+    with app.test_request_context():
+        first = app.json.response(rows)
+        assert rows.json is not None
+        rows.json = b'[{"id":2}]'
+        assert app.json.response(rows).get_data() == b'[{"id":2}]\n'
+    assert first.get_json() == [{"id": 1, "day": "2022-10-19"}]
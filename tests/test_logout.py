@@ -0,0 +1,7 @@
+def test_logout_access(client, app, authentication_headers):
+    headers = authentication_headers(is_admin=True)
+    response = client.post('/api/auth/logout-access', headers=headers)
+    assert response.json['message'] == "Access token has been revoked"
+
+    response = client.get('/api/employees/current', headers=headers)
+    assert response.status_code == 401
@@ -0,0 +1,25 @@
+def test_search_menus(client, app):
+    response = client.get('/api/menus/search?q=baco&day=Tuesday')
+    assert response.status_code == 200
+    assert response.json == [{"menu_id": 1, "restaurant_id": response.json[0]["restaurant_id"],
+                              "restaurant": "McDonald's", "day": "tuesday", "dishes": "Bacon"}]
+
+    assert client.get('/api/menus/search?q=bacon&day=monday').json == []
+    assert {row["day"] for row in client.get('/api/menus/search?q=mcdonald').json} == {
+        "monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"}
+
+
+def test_search_follows_menu_changes(client, app, authentication_headers):
+    headers = authentication_headers(is_admin=True)
+    menu = client.get('/api/menus/1').json
+    client.patch('/api/menus/1', json={"sunday": "Pho bo"}, headers=headers)
+    try:
+        assert client.get('/api/menus/search?q=pho').json[0]["dishes"] == "Pho bo"
+    finally:
+        client.patch('/api/menus/1', json={"sunday": menu["sunday"]}, headers=headers)
+    assert client.get('/api/menus/search?q=pho').json == []
+
+
+def test_search_invalid_args(client, app):
+    assert client.get('/api/menus/search?q=%20').status_code == 400
+    assert client.get('/api/menus/search?q=soup&day=someday').status_code == 400
@@ -0,0 +1,27 @@
+from datetime import date
+
+DAYS = ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")
+
+
+def test_menus_of_day(client, app):
+    menu = client.get('/api/menus/1').json
+    response = client.get('/api/menus/day/Tuesday')
+    assert response.status_code == 200
+    assert response.json[0] == {
+        "id": 1,
+        "restaurant_id": menu["restaurant_id"],
+        "restaurant": "McDonald's",
+        "tuesday": menu["tuesday"],
+    }
+
+
+def test_menus_of_today(client, app):
+    today = DAYS[date.today().weekday()]
+    response = client.get('/api/menus/today')
+    assert response.status_code == 200
+    assert response.json == client.get(f'/api/menus/day/{today}').json
+    assert client.get('/api/menus/today', headers={"If-None-Match": response.headers["ETag"]}).status_code == 304
+
+
+def test_menus_of_unknown_day(client, app):
+    assert client.get('/api/menus/day/someday').status_code == 400
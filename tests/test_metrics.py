@@ -0,0 +1,34 @@
+import os
+
+import pytest
+
+
+def test_server_timing_header(client, app):
+    response = client.get('/api/restaurants/1')
+    assert response.status_code == 200
+    assert response.headers["Server-Timing"].startswith("db;dur=")
+    assert "queries" in response.headers["Server-Timing"]
+
+
+def test_metrics_endpoint(client, app):
+    client.get('/api/menus/1')
+    response = client.get('/api/metrics')
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    body = response.get_data(as_text=True)
+    assert "# TYPE lunch_request_duration_seconds histogram" in body
+    assert 'lunch_request_queries_count{endpoint="menus.get_menu",method="GET"}' in body
+    assert "lunch_db_pool_checkout_seconds_count" in body
+    assert "lunch_requests_in_flight 1" in body
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+def test_pool_checkout_timed_after_fork(app):
+    from app.database.database import db
+
+    pid = os.fork()
+    if pid == 0:
+        # the child's pool is replaced after fork, its checkout must still be timed
+        os._exit(0 if db.pool.connect.__name__ == "checkout" else 1)
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
@@ -0,0 +1,32 @@
+def test_get_employees_page(client, app, authentication_headers):
+    headers = authentication_headers(is_admin=True)
+    response = client.get('/api/employees/?limit=1', headers=headers)
+    assert len(response.json) == 1 and response.headers.get("X-Next-Cursor")
+
+    cursor = response.headers["X-Next-Cursor"]
+    response = client.get(f'/api/employees/?limit=1&cursor={cursor}', headers=headers)
+    assert response.json[0]['firstname'] == "John"
+
+
+def test_get_restaurants_last_page(client, app):
+    response = client.get('/api/restaurants/?limit=10')
+    assert response.json[0]['name'] == "McDonald's" and "X-Next-Cursor" not in response.headers
+
+
+def test_invalid_page_args(client, app):
+    assert client.get('/api/menus/?cursor=bogus').status_code == 400
+    assert client.get('/api/menus/?limit=0').status_code == 400
+
+
+def test_employees_total_count(client, app, authentication_headers):
+    headers = authentication_headers(is_admin=True)
+    total = len(client.get('/api/employees/', headers=headers).json)
+    response = client.get('/api/employees/?limit=1', headers=headers)
+    assert response.headers["X-Total-Count"] == str(total)
+    assert "X-Total-Count" in client.get('/api/employees/inactive', headers=headers).headers
+
+
+def test_paging_headers_exposed_to_other_origins(client, app):
+    response = client.get('/api/menus/?limit=1', headers={"Origin": "https://lunch.example.com"})
+    exposed = {name.strip() for name in response.headers["Access-Control-Expose-Headers"].split(",")}
+    assert {"X-Next-Cursor", "X-Total-Count", "ETag"} <= exposed
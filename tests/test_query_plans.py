@@ -0,0 +1,101 @@
+from datetime import date
+
+import pytest
+
+
+def full_scans(connection, statement, parameters):
+    """
+    Return plan steps of statement which read a whole table instead of using an index
+    """
+    if connection.dialect.name == "postgresql":
+        connection.exec_driver_sql("SET enable_seqscan = off")
+        plan = connection.exec_driver_sql("EXPLAIN " + statement, parameters).fetchall()
+        return [row[0] for row in plan if "Seq Scan" in row[0]]
+    plan = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+    return [row[-1] for row in plan if row[-1].startswith("SCAN ") and "INDEX" not in row[-1]]
+
+
+def current_day_choices(models):
+    """
+    Read a page of today's choices, the page is only queried when the index of today's choices isn't empty
+    """
+    models.today_choices.page(0)
+    models.today_choices.track(10 ** 6, 8001, 1, date.today())
+    try:
+        return models.ChoicesModel.find_by_current_day(0, 10)
+    finally:
+        models.today_choices.discard(10 ** 6)
+
+
+HOT_QUERIES = {
+    "employee_by_email": lambda models: models.EmployeeModel.find_by_email("usertest", to_dict=False),
+    "employee_by_name": lambda models: models.EmployeeModel.find_by_name("John", "Doe", to_dict=False),
+    "employees_count": lambda models: models.EmployeeModel.count_all(),
+    "employees_inactive_page": lambda models: models.EmployeeModel.return_all_inactive(0, 10),
+    "employees_page": lambda models: models.EmployeeModel.return_all(0, 10),
+    "employee_choices": lambda models: models.EmployeeModel.find_by_id(1),
+    "employee_choices_range": lambda models: models.ChoicesModel.find_by_employee(
+        1, 0, 10, date(2020, 1, 1), date.today()),
+    "choice_by_employee_today": lambda models: models.ChoicesModel.find_by_employee_id(1, to_dict=False),
+    "choices_current_day": lambda models: current_day_choices(models),
+    "choices_day_index": lambda models: models.ChoicesModel.find_day_index(date.today()),
+    "choices_summary": lambda models: models.ChoiceTallyModel.summary(date.today()),
+    "menu_search": lambda models: models.MenuSearch.search(("soup",), "monday", 10),
+    "menu_by_restaurant_id": lambda models: models.MenusModel.find_by_restaurant_id(1, to_dict=False),
+    "menus_of_day": lambda models: models.MenusModel.find_by_day("monday", 0, 10),
+    "menus_page": lambda models: models.MenusModel.return_all(0, 10),
+    "restaurant_by_name": lambda models: models.RestaurantModel.find_by_name("McDonald's", to_dict=False),
+    "restaurants_page": lambda models: models.RestaurantModel.return_all(0, 10),
+    "revoked_token_by_jti": lambda models: models.RevokedTokenModel.is_jti_blacklisted("jti"),
+}
+
+
+@pytest.fixture
+def captured_selects(client):
+    from sqlalchemy import event
+    from app.cache import read_cache
+    from app.database.database import db
+
+    # first request creates the schema
+    client.get('/api/restaurants/1')
+    read_cache.clear()
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(db, "before_cursor_execute", capture)
+    yield statements
+    event.remove(db, "before_cursor_execute", capture)
+
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_hot_query_uses_index(name, app, captured_selects):
+    import app.models as models
+    from app.database.database import db, Session
+
+    HOT_QUERIES[name](models)
+    Session.remove()
+    assert captured_selects
+
+    with db.connect() as connection:
+        for statement, parameters in captured_selects:
+            assert not full_scans(connection, statement, parameters), statement
+
+
+def test_upgrade_adds_indexes(tmp_path):
+    from sqlalchemy import create_engine, inspect, text
+    from app.database.database import base
+    from app.database.migrations import upgrade, MIGRATIONS
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        for index in inspect(engine).get_indexes("employees"):
+            connection.execute(text(f"DROP INDEX {index['name']}"))
+
+    assert upgrade(engine) == [version for version, _, _ in MIGRATIONS]
+    indexes = {index["name"] for index in inspect(engine).get_indexes("employees")}
+    assert {"ix_employees_email", "ix_employees_active", "ix_employees_inactive"} <= indexes
+    assert upgrade(engine) == []
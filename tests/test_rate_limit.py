@@ -0,0 +1,59 @@
+import time
+
+
+def test_email_rate_limit(client, app):
+    from app.rate_limit import AuthLimits, MemoryBucketStore
+
+    app.extensions["auth_limits"] = AuthLimits(MemoryBucketStore(100), 100, 1, 2, 0.01, 0)
+    for _ in range(2):
+        response = client.post('/api/auth/login', json={"email": "ratelimited", "password": "wrong"})
+        assert response.status_code == 404
+    response = client.post('/api/auth/login', json={"email": "RateLimited", "password": "wrong"})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+    response = client.post('/api/auth/login', json={"email": "other", "password": "wrong"})
+    assert response.status_code == 404
+
+
+def test_hashing_concurrency_cap(client, app):
+    from app.rate_limit import AuthLimits
+
+    limits = app.extensions["auth_limits"] = AuthLimits(None, 100, 1, 100, 1, 1)
+    assert limits.hashing.acquire()
+    try:
+        response = client.post('/api/auth/login', json={"email": "capped", "password": "wrong"})
+        assert response.status_code == 429
+        assert "Retry-After" in response.headers
+    finally:
+        limits.hashing.release()
+    assert client.post('/api/auth/login', json={"email": "capped", "password": "wrong"}).status_code == 404
+    assert "lunch_auth_rejected_hashing 1" in client.get('/api/metrics').text
+
+
+def test_database_buckets(app):
+    from app.models import RateLimitBucketModel
+    from app.database.database import Session
+
+    key = f"test:{time.time()}"
+    now = time.time()
+    try:
+        assert RateLimitBucketModel.take(key, 2, 0.5, now) == 0
+        assert RateLimitBucketModel.take(key, 2, 0.5, now) == 0
+        assert RateLimitBucketModel.take(key, 2, 0.5, now) == 2
+        assert RateLimitBucketModel.take(key, 2, 0.5, now + 2) == 0
+    finally:
+        RateLimitBucketModel.prune(now + 10)
+        Session.remove()
+
+
+def test_email_limit_does_not_drain_ip_bucket(app):
+    from app.rate_limit import AuthLimits, MemoryBucketStore
+
+    limits = AuthLimits(MemoryBucketStore(100), 3, 0.01, 1, 0.01, 0)
+    assert limits.wait("10.0.0.1", "guessed") == 0
+    for _ in range(5):
+        assert limits.wait("10.0.0.1", "guessed") > 0
+    # colleagues behind the same address still log in
+    assert limits.wait("10.0.0.1", "colleague") == 0
+    assert limits.wait("10.0.0.1", "other.colleague") == 0
@@ -0,0 +1,32 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+
+def test_session_per_request(app):
+    from sqlalchemy import text
+    from app.database.database import Session
+
+    threads = 4
+    in_flight = threading.Barrier(threads)
+    sessions = []
+
+    @app.route("/test/session")
+    def session_of_request():
+        session = Session()
+        session.execute(text("SELECT 1"))
+        sessions.append(session)
+        # all requests hold their sessions at once
+        in_flight.wait(timeout=5)
+        assert Session() is session
+        return ""
+
+    def request():
+        response = app.test_client().get("/test/session")
+        return response.status_code, Session.registry.has()
+
+    with ThreadPoolExecutor(threads) as pool:
+        results = list(pool.map(lambda _: request(), range(threads)))
+
+    assert results == [(200, False)] * threads
+    assert len({id(session) for session in sessions}) == threads
+    assert not any(session.in_transaction() for session in sessions)
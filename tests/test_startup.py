@@ -0,0 +1,20 @@
+import pytest
+
+
+def test_startup_report(client, app):
+    assert set(app.extensions["startup_timings"]) == {"schema", "blocklist", "static", "pool", "caches"}
+    assert "lunch_startup_caches_seconds" in client.get('/api/metrics').text
+
+
+def test_startup_verifies_schema(app, monkeypatch, tmp_path):
+    from sqlalchemy import create_engine
+    from config import Config
+    from app.main import setup_startup
+    from app.database.migrations import pending, MIGRATIONS
+
+    assert pending(create_engine(f"sqlite:///{tmp_path / 'empty.db'}")) == [version for version, _, _ in MIGRATIONS]
+
+    monkeypatch.setattr(Config, "STARTUP_CREATE_SCHEMA", False)
+    monkeypatch.setattr("app.main.pending", lambda engine: [99])
+    with pytest.raises(RuntimeError):
+        setup_startup(app)
@@ -0,0 +1,9 @@
+def test_stream_menus(client, app):
+    response = client.get('/api/menus/?stream=true')
+    assert response.is_streamed and response.json == client.get('/api/menus/').json
+
+
+def test_stream_employees(client, app, authentication_headers):
+    headers = authentication_headers(is_admin=True)
+    response = client.get('/api/employees/?stream=1&limit=1', headers=headers)
+    assert response.is_streamed and len(response.json) == 1